@@ -1,5 +1,12 @@
+import os
+import json
+import bisect
+import shutil
+import hashlib
+import argparse
+import importlib.util
 import torch
-from datasets import load_dataset
+from datasets import load_dataset, load_from_disk, Dataset
 from transformers import (
     AutoModelForCausalLM,
     AutoTokenizer,
@@ -9,68 +16,237 @@ from transformers import (
     DataCollatorForLanguageModeling
 )
 from peft import get_peft_model, LoraConfig
+from batch_runner import file_sha256
+from train_metrics import CountingCollator, ThroughputCallback, parse_step_range
 
-# Load dataset
-dataset = load_dataset("json", data_files="genos_generated_from_wiki.jsonl", split="train")
+DATA_FILE = "genos_generated_from_wiki.jsonl"
+MODEL_NAME = "google/gemma-2b-it"
+OUTPUT_DIR = "genos_lora_adapter"
+MAX_LENGTH = 512
+PAD_MULTIPLE = 8             # tensor-core friendly batch widths
+TOKEN_CACHE_DIR = ".token_cache"
+TOKENIZE_VERSION = 1         # bump when tokenize_dataset changes what it produces
 
-# Tokenizer and base model
-model_name = "google/gemma-2b-it"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
+PROMPT_TEMPLATE = "<|system|>You are Genos, a cyborg with unwavering resolve.<|end|>\n<|user|>{instruction}\n{input}<|end|>\n<|genos|>{output}"
 
-bnb_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_compute_dtype=torch.float16,
-    bnb_4bit_use_double_quant=True,
-    bnb_4bit_quant_type="nf4"
-)
-
-base_model = AutoModelForCausalLM.from_pretrained(
-    model_name,
-    device_map="auto",
-    trust_remote_code=True,
-    quantization_config=bnb_config
-)
+# --------------------------
+# Data
+# --------------------------
 
 # Format prompts
 def format_example(example):
-    prompt = f"<|system|>You are Genos, a cyborg with unwavering resolve.<|end|>\n<|user|>{example['instruction']}\n{example['input']}<|end|>\n<|genos|>{example['output']}"
+    prompt = PROMPT_TEMPLATE.format(instruction=example['instruction'], input=example['input'], output=example['output'])
     return {"text": prompt}
 
-dataset = dataset.map(format_example)
-tokenized = dataset.map(lambda x: tokenizer(x["text"], truncation=True, padding="max_length", max_length=512), remove_columns=dataset.column_names)
-
-# LoRA config
-lora = LoraConfig(
-    r=8,
-    lora_alpha=16,
-    lora_dropout=0.1,
-    bias="none",
-    task_type="CAUSAL_LM",
-    target_modules=["q_proj", "v_proj"]
-)
+def tokenize_dataset(dataset, tokenizer, max_length=MAX_LENGTH):
+    # No padding here: batches are padded (or packed) to what they actually need
+    def tokenize(batch):
+        encoded = tokenizer(batch["text"], truncation=True, max_length=max_length - 1)
+        # End every example with EOS so the model learns where a reply stops,
+        # and so packed neighbours are separated
+        encoded["input_ids"] = [ids + [tokenizer.eos_token_id] for ids in encoded["input_ids"]]
+        encoded["attention_mask"] = [mask + [1] for mask in encoded["attention_mask"]]
+        return encoded
 
-model = get_peft_model(base_model, lora)
-
-# Training args
-args = TrainingArguments(
-    output_dir="genos_lora_adapter",
-    per_device_train_batch_size=2,
-    gradient_accumulation_steps=4,
-    num_train_epochs=4,
-    learning_rate=2e-4,
-    fp16=True,
-    logging_steps=10,
-    save_strategy="epoch",
-    report_to="none"
-)
+    dataset = dataset.map(format_example)
+    return dataset.map(tokenize, batched=True, remove_columns=dataset.column_names)
 
-# Trainer
-trainer = Trainer(
-    model=model,
-    args=args,
-    train_dataset=tokenized,
-    data_collator=DataCollatorForLanguageModeling(tokenizer, mlm=False)
-)
+def token_cache_key(data_file, tokenizer, max_length):
+    payload = json.dumps({
+        "data": file_sha256(data_file),
+        "template": PROMPT_TEMPLATE,
+        "tokenizer": tokenizer.name_or_path,
+        "vocab": len(tokenizer),
+        "max_length": max_length,
+        "version": TOKENIZE_VERSION
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+def cached_dataset(cache_path, build, refresh=False, what="dataset"):
+    # Arrow on disk is memory-mapped by load_from_disk, so a cache hit costs almost nothing
+    if os.path.isdir(cache_path) and not refresh:
+        print(f"♻️ Using cached {what} {cache_path}")
+        return load_from_disk(cache_path)
+
+    dataset = build()
+
+    # Save next to the final path and rename, so an interrupted run leaves no half cache
+    temp_path = cache_path + ".tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    dataset.save_to_disk(temp_path)
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.replace(temp_path, cache_path)
+    print(f"💾 Cached {what} to {cache_path}")
+    return load_from_disk(cache_path)
+
+def load_tokenized(data_file, tokenizer, max_length=MAX_LENGTH, cache_dir=TOKEN_CACHE_DIR, refresh=False, packing=False):
+    # Returns (tokenized, packed); packed is None unless packing
+    cache_path = os.path.join(cache_dir, token_cache_key(data_file, tokenizer, max_length))
+    tokenized = cached_dataset(
+        cache_path,
+        lambda: tokenize_dataset(load_dataset("json", data_files=data_file, split="train"), tokenizer, max_length),
+        refresh, "tokenized dataset"
+    )
+    if not packing:
+        return tokenized, None
+
+    # Packs depend only on the tokenized examples and max_length, both already in the key
+    packed = cached_dataset(
+        cache_path + "-packed",
+        lambda: pack_examples(tokenized["input_ids"], max_length),
+        refresh, "packed dataset"
+    )
+    return tokenized, packed
+
+def pack_examples(sequences, max_length=MAX_LENGTH):
+    # Best-fit decreasing: longest examples first, each into the fullest pack it still fits.
+    # `room` is kept sorted by free space, so finding that pack is a bisect, not a scan
+    packs = []
+    room = []                    # (free tokens, pack number)
+    for ids in sorted(sequences, key=len, reverse=True):
+        i = bisect.bisect_left(room, (len(ids), -1))
+        if i < len(room):
+            free, k = room.pop(i)
+            packs[k].append(ids)
+        else:
+            free, k = max_length, len(packs)
+            packs.append([ids])
+        if free > len(ids):
+            bisect.insort(room, (free - len(ids), k))
+
+    # position_ids restart at 0 for every example; that is what marks the boundaries
+    return Dataset.from_dict({
+        "input_ids": [[t for ids in pack for t in ids] for pack in packs],
+        "position_ids": [[p for ids in pack for p in range(len(ids))] for pack in packs]
+    })
+
+class PackedCollator:
+    # Flattens a batch of packs into one padding-free row. With flash-attention the model
+    # turns the position_ids resets into per-example attention, so packs never attend
+    # across example boundaries.
+    def __call__(self, features):
+        input_ids = [t for f in features for t in f["input_ids"]]
+        position_ids = [p for f in features for p in f["position_ids"]]
+        # The first token of each example must not be predicted from the previous one
+        labels = [-100 if p == 0 else t for t, p in zip(input_ids, position_ids)]
+        return {
+            "input_ids": torch.tensor([input_ids]),
+            "position_ids": torch.tensor([position_ids]),
+            "labels": torch.tensor([labels])
+        }
+
+def print_padding_report(tokenized, packed, batch_size, max_length=MAX_LENGTH):
+    # Tokens the model processes per epoch under each strategy, vs tokens that carry signal
+    lengths = [len(ids) for ids in tokenized["input_ids"]]
+    ordered = sorted(lengths)
+    batches = [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+    totals = {
+        "max_length": len(lengths) * max_length,
+        "dynamic": sum(len(b) * -(-max(b) // PAD_MULTIPLE) * PAD_MULTIPLE for b in batches)
+    }
+    if packed is not None:
+        totals["packed"] = sum(len(ids) for ids in packed["input_ids"])
+
+    real = sum(lengths)
+    print(f"📏 {len(lengths)} examples, {real} tokens, longest {max(lengths)}")
+    for name, total in totals.items():
+        print(f"   {name:>10}: {total} tokens per epoch, {1 - real / total:.1%} padding")
+
+# --------------------------
+# Training
+# --------------------------
+
+def load_model(model_name, packing):
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_compute_dtype=torch.float16,
+        bnb_4bit_use_double_quant=True,
+        bnb_4bit_quant_type="nf4"
+    )
+
+    # flash-attention needs half-precision weights outside the quantized layers
+    extra = {"attn_implementation": "flash_attention_2", "torch_dtype": torch.float16} if packing else {}
+    return AutoModelForCausalLM.from_pretrained(
+        model_name,
+        device_map="auto",
+        trust_remote_code=True,
+        quantization_config=bnb_config,
+        **extra
+    )
+
+def main(args):
+    profile_steps = parse_step_range(args.profile_steps)
+    packing = args.packing
+    if packing and importlib.util.find_spec("flash_attn") is None:
+        # Without flash-attention, packed examples would attend to each other
+        print("[WARN] flash-attn is not installed; falling back to length-grouped dynamic padding")
+        packing = False
+
+    # Tokenizer and dataset (re-tokenized and re-packed only when data, template, tokenizer or length change)
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    tokenized, packed = load_tokenized(args.data, tokenizer, args.max_length, args.token_cache, args.retokenize, packing)
+    print_padding_report(tokenized, packed, args.batch_size, args.max_length)
+
+    base_model = load_model(args.model, packing)
+
+    # LoRA config
+    lora = LoraConfig(
+        r=8,
+        lora_alpha=16,
+        lora_dropout=0.1,
+        bias="none",
+        task_type="CAUSAL_LM",
+        target_modules=["q_proj", "v_proj"]
+    )
+
+    model = get_peft_model(base_model, lora)
+
+    # Training args
+    training_args = TrainingArguments(
+        output_dir=args.output,
+        per_device_train_batch_size=args.batch_size,
+        gradient_accumulation_steps=4,
+        num_train_epochs=4,
+        learning_rate=2e-4,
+        fp16=True,
+        logging_steps=10,
+        save_strategy="epoch",
+        report_to="none",
+        # Batches of similar length pad very little; packs are already ~max_length
+        group_by_length=not packing,
+        remove_unused_columns=False
+    )
+
+    if packing:
+        train_dataset, collator = packed, PackedCollator()
+    else:
+        train_dataset = tokenized
+        collator = DataCollatorForLanguageModeling(tokenizer, mlm=False, pad_to_multiple_of=PAD_MULTIPLE)
+
+    # Count real tokens as batches are built; the callback turns them into tokens/sec
+    collator = CountingCollator(collator)
+
+    # Trainer
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        data_collator=collator,
+        callbacks=[ThroughputCallback(collator, args.output, profile_steps)]
+    )
+
+    trainer.train()
+    model.save_pretrained(args.output)
 
-trainer.train()
-model.save_pretrained("genos_lora_adapter")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tune a Genos LoRA adapter")
+    parser.add_argument("--data", default=DATA_FILE, help="training JSONL")
+    parser.add_argument("--model", default=MODEL_NAME, help="base model name or path")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="adapter output folder")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH, help="longest sequence / pack size")
+    parser.add_argument("--batch-size", type=int, default=2, help="per-device batch size")
+    parser.add_argument("--packing", action="store_true", help="pack several examples per sequence (needs flash-attn)")
+    parser.add_argument("--token-cache", default=TOKEN_CACHE_DIR, help="folder for pre-tokenized datasets")
+    parser.add_argument("--retokenize", action="store_true", help="rebuild the pre-tokenized and packed caches")
+    parser.add_argument("--profile-steps", default=None, help="torch.profiler trace for steps START:END")
+    main(parser.parse_args())
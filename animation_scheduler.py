@@ -0,0 +1,99 @@
+# Global animation scheduler: pauses every tracked QMovie while the window is hidden
+# and throttles playback / drops non-essential overlays when the battery runs low.
+
+from PySide6.QtCore import QObject, QEvent, QTimer
+from PySide6.QtGui import QMovie
+
+LOW_BATTERY_THRESHOLD = 20   # percent, same cut-off check_battery uses
+LOW_POWER_SPEED = 50         # QMovie speed (percent) while on low battery
+POLL_INTERVAL_MS = 5000
+
+
+class AnimationScheduler(QObject):
+    def __init__(self, window, battery_reader, low_battery_threshold=LOW_BATTERY_THRESHOLD,
+                 low_power_speed=LOW_POWER_SPEED, poll_interval=POLL_INTERVAL_MS):
+        super().__init__(window)
+        self.window = window
+        self.battery_reader = battery_reader
+        self.low_battery_threshold = low_battery_threshold
+        self.low_power_speed = low_power_speed
+
+        self.entries = []             # [movie, proxy, essential]
+        self.suspended = set()        # ids of movies we paused ourselves
+        self.hidden = False
+        self.low_power = False
+        self._handle_filtered = False
+
+        window.installEventFilter(self)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.refresh)
+        self.poll_timer.start(poll_interval)
+
+    # -------- Registration --------
+
+    def track(self, movie, proxy=None, essential=True):
+        self.entries.append([movie, proxy, essential])
+        self._apply(movie, proxy, essential)
+        return movie
+
+    def untrack(self, movie):
+        self.entries = [e for e in self.entries if e[0] is not movie]
+        self.suspended.discard(id(movie))
+
+    def untrack_overlays(self):
+        for movie, _, essential in list(self.entries):
+            if not essential:
+                self.untrack(movie)
+
+    # -------- Policy --------
+
+    def is_window_hidden(self):
+        if self.window.isMinimized() or not self.window.isVisible():
+            return True
+        handle = self.window.windowHandle()
+        if handle is not None:
+            if not self._handle_filtered:
+                handle.installEventFilter(self)
+                self._handle_filtered = True
+            return not handle.isExposed()
+        return False
+
+    def refresh(self):
+        try:
+            battery = self.battery_reader()
+        except Exception as e:
+            print(f"[WARN] AnimationScheduler: battery read failed: {e}")
+            battery = 100
+
+        hidden = self.is_window_hidden()
+        low_power = battery < self.low_battery_threshold
+        if hidden == self.hidden and low_power == self.low_power:
+            return
+
+        self.hidden = hidden
+        self.low_power = low_power
+        for movie, proxy, essential in self.entries:
+            self._apply(movie, proxy, essential)
+
+    def _apply(self, movie, proxy, essential):
+        show_overlay = essential or not self.low_power
+        if proxy is not None:
+            proxy.setVisible(show_overlay)
+
+        movie.setSpeed(self.low_power_speed if self.low_power else 100)
+
+        if self.hidden or not show_overlay:
+            if movie.state() == QMovie.Running:
+                movie.setPaused(True)
+                self.suspended.add(id(movie))
+        elif id(movie) in self.suspended:
+            # Only resume what we paused, so movies stopped elsewhere stay stopped
+            self.suspended.discard(id(movie))
+            movie.setPaused(False)
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.WindowStateChange, QEvent.Show, QEvent.Hide, QEvent.Expose):
+            # Defer until Qt has finished updating visibility/exposure
+            QTimer.singleShot(0, self.refresh)
+        return super().eventFilter(obj, event)
@@ -0,0 +1,97 @@
+# Shared helpers for the asset tools: process pool, atomic writes and hash sidecars
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+SIDECAR_SUFFIX = ".hash"
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@contextmanager
+def atomic_output(path):
+    # Yield a temp path next to `path`; it only replaces `path` if the block succeeds
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        yield temp_path
+        # mkstemp creates 0600 files; keep the replaced file's permissions instead
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        else:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def read_records(output_path):
+    # {tool: record}; each tool that touched the file keeps its own record
+    try:
+        with open(output_path + SIDECAR_SUFFIX, "r") as f:
+            records = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # A bare record is the old single-tool format: treat it as unknown
+    return {} if "params" in records else records
+
+def read_sidecar(output_path, tool):
+    return read_records(output_path).get(tool)
+
+def write_sidecar(output_path, source_hash, params, tool, previous_output=None):
+    # In-place tools pass the hash the file had before they ran: records of other tools
+    # that described that file stay valid, so clean -> optimize -> clean skips the 2nd clean
+    output = file_sha256(output_path)
+    records = {
+        name: dict(record, output=output)
+        for name, record in read_records(output_path).items()
+        if name != tool and previous_output is not None and record.get("output") == previous_output
+    }
+    records[tool] = {
+        "source": source_hash,
+        "params": params,
+        "output": output
+    }
+    with atomic_output(output_path + SIDECAR_SUFFIX) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(records, f, indent=4)
+
+def is_up_to_date(output_path, source_hash, params, tool, output_hash=None):
+    record = read_sidecar(output_path, tool)
+    if not record or not os.path.exists(output_path):
+        return False
+    if record.get("params") != params:
+        return False
+    # In-place jobs pass source_hash=None: the output itself is the thing we last wrote
+    if source_hash is not None and record.get("source") != source_hash:
+        return False
+    return record.get("output") == (output_hash or file_sha256(output_path))
+
+def run_batch(task, jobs, workers=None):
+    # `task` must be a module-level function returning a short status string
+    results = {}
+    if not jobs:
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(task, *job): job for job in jobs}
+        for future in as_completed(futures):
+            # Full path: the same file name can appear in several folders
+            name = futures[future][0]
+            try:
+                results[name] = future.result()
+                print(f"✅ {name}: {results[name]}")
+            except Exception as e:
+                results[name] = f"failed: {e}"
+                print(f"❌ Failed to process {name}: {e}")
+    return results
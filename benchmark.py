@@ -0,0 +1,405 @@
+# Headless benchmark suite for the chat window's hot paths and the GIF/MP4 asset tools
+#
+# Runs on any Linux box: Qt renders offscreen, SDL plays to its dummy audio driver and a
+# tiny numpy causal LM stands in for Gemma. Everything happens in a scratch folder of
+# synthetic assets, so results compare between machines and between commits.
+#
+#   python benchmark.py                               # writes bench_results.json
+#   python benchmark.py --compare baseline.json       # exit 1 if a p50 regressed
+
+import os
+
+# Must be set before Qt / SDL are loaded
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import sys
+import json
+import time
+import zlib
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from types import SimpleNamespace
+import numpy as np
+from PIL import Image, ImageDraw
+from turn_tracer import percentile
+
+REPORT_PATH = "bench_results.json"
+TOLERANCE = 0.25             # --compare: a p50 this much slower than the baseline is a regression
+
+GIF_SIZE = (320, 320)
+GIF_FRAMES = 24
+LAYER_COUNTS = [1, 4, 16, 64]
+CONFIG_LAYER_COUNTS = [16, 256, 1024]
+TOKEN_COUNTS = [16, 64, 100]
+EMOTIONS = ["neutral", "happy", "vengeful", "defensive", "blush", "goofy", "angry"]
+
+# Keywords detect_emotion reacts to, mixed into the stub model's vocabulary
+KEYWORDS = ["kill", "revenge", "attack", "furious", "haha", "joke", "thanks", "happy",
+            "protect", "shield", "cute", "demure"]
+
+
+# -------- Stand-in causal LM --------
+
+class StubIds:
+    # Just enough of a torch tensor for generate_text: .shape, .to() and [0]
+    def __init__(self, array):
+        self.array = array
+        self.shape = array.shape
+
+    def to(self, device):
+        return self
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+
+class StubTokenizer:
+    def __init__(self, vocab):
+        self.vocab = vocab
+        self.index = {word: i for i, word in enumerate(vocab)}
+
+    def __call__(self, text, return_tensors=None):
+        # crc32 rather than hash(): str hashes change between processes
+        ids = [self.index.get(word, zlib.crc32(word.encode()) % len(self.vocab)) for word in text.lower().split()]
+        return SimpleNamespace(input_ids=StubIds(np.array([ids or [0]])))
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(self.vocab[int(i)] for i in ids)
+
+
+class StubCausalLM:
+    # A one-layer recurrent toy with real per-token matmuls, so prefill and decode cost
+    # scale like a model's instead of being a sleep. Greedy and seeded: fully repeatable.
+    device = "cpu"
+
+    def __init__(self, vocab_size, hidden=256, seed=0):
+        rng = np.random.default_rng(seed)
+        scale = 1 / np.sqrt(hidden)
+        self.embed = rng.standard_normal((vocab_size, hidden), dtype=np.float32)
+        self.weight = rng.standard_normal((hidden, hidden), dtype=np.float32) * scale
+        self.out = rng.standard_normal((hidden, vocab_size), dtype=np.float32) * scale
+
+    def generate(self, input_ids, max_new_tokens=100, streamer=None, **sampling):
+        ids = [int(i) for i in input_ids[0]]
+        if streamer:
+            streamer.put(input_ids.array)
+        state = np.tanh(self.embed[ids] @ self.weight)[-1]
+        for _ in range(max_new_tokens):
+            token = int(np.argmax(state @ self.out))
+            ids.append(token)
+            if streamer:
+                streamer.put(np.array([token]))
+            state = np.tanh((state + self.embed[token]) @ self.weight)
+        if streamer:
+            streamer.end()
+        return StubIds(np.array([ids]))
+
+
+def stub_vocab(size=512):
+    return KEYWORDS + [f"w{i}" for i in range(size - len(KEYWORDS))]
+
+
+# -------- Synthetic assets --------
+
+def write_fixture_gif(path, size=GIF_SIZE, frames=GIF_FRAMES, seed=0):
+    # A moving disc on transparency, with a dark border line for clean_gif to strip
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    width, height = size
+    images = []
+    for i in range(frames):
+        image = Image.new("RGBA", size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        x = (seed * 37 + i * width // frames) % width
+        draw.ellipse([x - 40, height // 2 - 40, x + 40, height // 2 + 40], fill=(255, 140, 0, 255))
+        draw.line([0, height - 2, width, height - 2], fill=(10, 10, 10, 255), width=2)
+        images.append(image)
+    images[0].save(path, save_all=True, append_images=images[1:], loop=0, duration=100, disposal=2)
+
+def write_fixture_mp4(path, seconds=4):
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi",
+        "-i", f"testsrc=size={GIF_SIZE[0]}x{GIF_SIZE[1]}:rate=30", "-t", str(seconds),
+        "-pix_fmt", "yuv420p", path
+    ]
+    subprocess.run(cmd, check=True)
+
+def bench_layers(count, offset=0):
+    return {
+        f"layer_{offset + i:03d}.gif": {
+            "position_percent": [(i % 8) / 8, (i // 8 % 8) / 8],
+            "size_percent": [0.2, 0.2],
+            "rotation": (i * 15) % 360 - 180,
+            "opacity": 0.8
+        }
+        for i in range(count)
+    }
+
+
+# -------- Measurement --------
+
+def time_calls(func, runs, warmup=1):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+def summarize(samples_ms):
+    return {
+        "runs": len(samples_ms),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 4),
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p95_ms": round(percentile(samples_ms, 95), 4),
+        "min_ms": round(min(samples_ms), 4)
+    }
+
+def cycle(values):
+    state = {"i": -1}
+    def next_value():
+        state["i"] = (state["i"] + 1) % len(values)
+        return values[state["i"]]
+    return next_value
+
+
+# -------- Benchmarks --------
+
+def bench_generate_text(genos, runs):
+    vocab = stub_vocab()
+    tokenizer, model = StubTokenizer(vocab), StubCausalLM(len(vocab))
+    prompt = "Genos what is your power level today and are you ready to protect the city"
+    return {
+        f"generate_text/{tokens}_tokens": time_calls(lambda: genos.generate_text(prompt, model, tokenizer, tokens), runs)
+        for tokens in TOKEN_COUNTS
+    }
+
+def bench_detect_emotion(genos, runs):
+    vocab = stub_vocab()
+    rng = np.random.default_rng(1)
+    texts = {
+        "short": [" ".join(rng.choice(vocab, 12)) for _ in range(64)],
+        "long": [" ".join(rng.choice(vocab, 400)) for _ in range(64)],
+        # No keyword at all: every branch is scanned
+        "no_match": [" ".join(rng.choice(vocab[len(KEYWORDS):], 400)) for _ in range(64)]
+    }
+    results = {}
+    for name, samples in texts.items():
+        text = cycle(samples)
+        results[f"detect_emotion/{name}"] = time_calls(lambda: genos.detect_emotion(text()), runs * 50)
+    return results
+
+def bench_update_emote(window, app, runs):
+    emotion = cycle(EMOTIONS)
+    results = {}
+    for mode in ["base", "combat"]:
+        window.current_mode = mode
+        def call():
+            window.update_emote(emotion())
+            app.processEvents()
+        results[f"update_emote/{mode}"] = time_calls(call, runs)
+    window.current_mode = "base"
+    return results
+
+def bench_load_vfx_layers(window, app, runs):
+    results = {}
+    for count in LAYER_COUNTS:
+        state = f"bench_{count}"
+        def call():
+            window.apply_vfx(state)
+            app.processEvents()
+        results[f"load_vfx_layers/{count}_layers"] = time_calls(call, runs)
+        results[f"load_vfx_layers/{count}_layers"]["layers_loaded"] = len(window.vfx_proxies)
+    return results
+
+def bench_save_effects_config(window, runs):
+    store = window.effects_store
+    results = {"save_effects_config/mark_dirty": time_calls(window.save_effects_config, runs * 50)}
+    store.flush(wait=True)
+
+    for count in CONFIG_LAYER_COUNTS:
+        window.effects_config["states"]["bench_write"] = bench_layers(count, offset=1000)
+        layer = next(iter(window.effects_config["states"]["bench_write"].values()))
+        rotation = cycle(list(range(-180, 180)))
+        def call():
+            # One edit plus the write it coalesces into, waited for
+            layer["rotation"] = rotation()
+            window.save_effects_config()
+            store.flush(wait=True)
+        stats = time_calls(call, runs)
+        stats["writes_per_s"] = round(1000 / stats["mean_ms"], 1)
+        stats["bytes"] = os.path.getsize(store.path)
+        results[f"save_effects_config/{count}_layers"] = stats
+    del window.effects_config["states"]["bench_write"]
+    store.flush(wait=True)
+    return results
+
+def bench_transcript(window, runs):
+    # Append cost once the on-screen window is full; it should not grow with history
+    from transcript import MAX_ROWS
+    transcript = window.output_box
+    text = cycle([f"Genos: {' '.join(['power levels nominal'] * n)}" for n in range(1, 8)])
+    results = {}
+    for history in [MAX_ROWS, 4 * MAX_ROWS]:
+        while transcript.transcript.log.count < history:
+            transcript.append(text())
+        results[f"transcript/append_after_{history}"] = time_calls(lambda: transcript.append(text()), runs * 5)
+    return results
+
+def bench_gif_tools(workspace, runs):
+    from clean_gif import remove_black_lines_from_gif
+    from optimize_gif import optimize_gif
+    from mp4_to_gif import stream_mp4_to_gif
+
+    fixture = os.path.join(workspace, "tools", "fixture.gif")
+    scratch = os.path.join(workspace, "tools", "scratch.gif")
+    write_fixture_gif(fixture)
+
+    def timed_on_copy(func):
+        # The tools rewrite in place: fresh copy every run, copying is not timed
+        samples = []
+        for _ in range(runs):
+            shutil.copyfile(fixture, scratch)
+            start = time.perf_counter()
+            func(scratch)
+            samples.append((time.perf_counter() - start) * 1000)
+        return summarize(samples)
+
+    runs = max(3, runs // 4)
+    results = {
+        "clean_gif/palette": timed_on_copy(lambda path: remove_black_lines_from_gif(path, palette=True)),
+        "clean_gif/rgba": timed_on_copy(lambda path: remove_black_lines_from_gif(path, palette=False)),
+        "optimize_gif": timed_on_copy(optimize_gif)
+    }
+
+    if shutil.which("ffmpeg") and shutil.which("ffprobe"):
+        mp4 = os.path.join(workspace, "tools", "fixture.mp4")
+        write_fixture_mp4(mp4)
+        results["mp4_to_gif"] = time_calls(lambda: stream_mp4_to_gif(mp4, scratch), runs)
+    else:
+        results["mp4_to_gif"] = {"skipped": "ffmpeg/ffprobe not on PATH"}
+    return results
+
+
+# -------- Suite --------
+
+def prepare_workspace(workspace):
+    # Everything load_genos reads relative to the working directory lives in here
+    os.makedirs(os.path.join(workspace, "assets", "vfx"), exist_ok=True)
+    fixture = os.path.join(workspace, "assets", "vfx", "layer_000.gif")
+    write_fixture_gif(fixture)
+    for i in range(1, max(LAYER_COUNTS)):
+        shutil.copyfile(fixture, os.path.join(workspace, "assets", "vfx", f"layer_{i:03d}.gif"))
+
+    config = {"states": {f"bench_{count}": bench_layers(count) for count in LAYER_COUNTS}}
+    with open(os.path.join(workspace, "effects_config.json"), "w") as f:
+        json.dump(config, f, indent=4)
+
+def environment():
+    import PySide6
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "pyside6": PySide6.__version__,
+        "numpy": np.__version__
+    }
+
+def run_suite(runs=20):
+    workspace = tempfile.mkdtemp(prefix="genos_bench_")
+    repo_dir = os.getcwd()
+    os.chdir(workspace)
+    try:
+        prepare_workspace(workspace)
+        # Imported here: load_genos resolves its asset paths against the working directory
+        from PySide6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+        import load_genos as genos
+
+        for emote_set in genos.GENOS_EMOTE_SETS.values():
+            for seed, path in enumerate(emote_set.values()):
+                write_fixture_gif(path, seed=seed)
+
+        meta = environment()
+        try:
+            genos.init_audio()
+            meta["audio"] = "dummy"
+        except Exception as e:
+            meta["audio"] = f"unavailable: {e}"
+
+        window = genos.GenosChat(os.path.join(workspace, "model_snapshot"))
+        window.show()
+        app.processEvents()
+
+        results = {}
+        print("⏱️ generate_text")
+        results.update(bench_generate_text(genos, runs))
+        print("⏱️ detect_emotion")
+        results.update(bench_detect_emotion(genos, runs))
+        print("⏱️ update_emote")
+        results.update(bench_update_emote(window, app, runs))
+        print("⏱️ load_vfx_layers")
+        results.update(bench_load_vfx_layers(window, app, runs))
+        print("⏱️ save_effects_config")
+        results.update(bench_save_effects_config(window, runs))
+        print("⏱️ transcript")
+        results.update(bench_transcript(window, runs))
+        print("⏱️ GIF/MP4 tools")
+        results.update(bench_gif_tools(workspace, runs))
+
+        window.effects_store.close()
+        window.close()
+        return {"environment": meta, "results": results}
+    finally:
+        os.chdir(repo_dir)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    # Returns the names whose p50 got slower than the baseline by more than `tolerance`
+    regressions = []
+    for name, stats in current["results"].items():
+        before = baseline.get("results", {}).get(name, {})
+        if "p50_ms" not in stats or "p50_ms" not in before or not before["p50_ms"]:
+            continue
+        ratio = stats["p50_ms"] / before["p50_ms"]
+        flag = "❌" if ratio > 1 + tolerance else "✅"
+        print(f"{flag} {name}: {before['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms ({ratio:.2f}x)")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+def print_summary(report):
+    for name, stats in report["results"].items():
+        if "skipped" in stats:
+            print(f"   {name:<36} skipped ({stats['skipped']})")
+        else:
+            print(f"   {name:<36} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless benchmarks for Genos hot paths and asset tools")
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per benchmark (more for the cheap ones)")
+    parser.add_argument("--output", default=REPORT_PATH, help="where to write the JSON results")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed p50 slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = run_suite(args.runs)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print_summary(report)
+    print(f"📝 Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,174 @@
+# Incremental asset build: sources/<set>/<name>.(mp4|gif) -> <set>/<name>.gif + assets_manifest.json
+#
+# Every stage output is cached under .build_cache/<stage>/ by a hash of its input
+# content and parameters, so only sources that actually changed are rebuilt.
+
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from mp4_to_gif import stream_mp4_to_gif
+from clean_gif import remove_black_lines_from_gif
+from optimize_gif import optimize_gif
+from batch_runner import atomic_output, file_sha256, read_sidecar, write_sidecar, is_up_to_date, run_batch
+
+SOURCE_DIR = "sources"
+OUTPUT_ROOT = "."
+CACHE_DIR = ".build_cache"
+TOOL = "build_assets"
+MANIFEST_PATH = "assets_manifest.json"
+SOURCE_EXTENSIONS = (".mp4", ".gif")
+
+# --------------------------
+# Stages
+# --------------------------
+
+def stage_gif(src, out, params):
+    stream_mp4_to_gif(src, out, params["fps"])
+
+def stage_clean(src, out, params):
+    shutil.copyfile(src, out)
+    remove_black_lines_from_gif(out, params["threshold"])
+
+def stage_optimize(src, out, params):
+    report = optimize_gif(src, out)
+    if report["bytes_after"] >= report["bytes_before"]:
+        shutil.copyfile(src, out)
+
+# Each stage names the stage it consumes; a source enters the graph at its own format
+STAGES = {
+    "gif": {"after": "mp4", "run": stage_gif, "params": {"fps": 10}},
+    "clean": {"after": "gif", "run": stage_clean, "params": {"threshold": 40}},
+    "optimize": {"after": "clean", "run": stage_optimize, "params": {}},
+}
+FINAL_STAGE = "optimize"
+
+def stage_chain(source_format):
+    chain = []
+    stage = FINAL_STAGE
+    while stage != source_format:
+        if stage not in STAGES:
+            raise ValueError(f"no stage path from {source_format} to {FINAL_STAGE}")
+        chain.append(stage)
+        stage = STAGES[stage]["after"]
+    return chain[::-1]
+
+def cache_key(stage, params, input_hash):
+    payload = json.dumps([stage, params, input_hash], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# --------------------------
+# Build
+# --------------------------
+
+def build_target(source_path, source_hash, dest_path):
+    source_format = os.path.splitext(source_path)[1].lower().lstrip(".")
+    chain = stage_chain(source_format)
+    input_path, input_hash = source_path, source_hash
+    ran = []
+
+    for stage in chain:
+        params = STAGES[stage]["params"]
+        cache_path = os.path.join(CACHE_DIR, stage, cache_key(stage, params, input_hash) + ".gif")
+        record = read_sidecar(cache_path, TOOL) if os.path.exists(cache_path) else None
+        if record is None:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with atomic_output(cache_path) as temp_path:
+                STAGES[stage]["run"](input_path, temp_path, params)
+            write_sidecar(cache_path, input_hash, params, TOOL)
+            record = read_sidecar(cache_path, TOOL)
+            ran.append(stage)
+        input_path, input_hash = cache_path, record["output"]
+
+    # Install the final artifact only if the deployed copy differs
+    install_params = {"chain": [[stage, STAGES[stage]["params"]] for stage in chain]}
+    if ran or not is_up_to_date(dest_path, source_hash, install_params, TOOL):
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        with atomic_output(dest_path) as temp_path:
+            shutil.copyfile(input_path, temp_path)
+        write_sidecar(dest_path, source_hash, install_params, TOOL)
+        return f"built ({', '.join(ran) or 'cached'}) -> {dest_path}"
+    return "up to date"
+
+def hash_sources(sources):
+    # Re-hash a source only when its size or mtime moved since the last build
+    index_path = os.path.join(CACHE_DIR, "source_hashes.json")
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    hashes = {}
+    for path in sources:
+        stat = os.stat(path)
+        entry = index.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            hashes[path] = entry[2]
+        else:
+            hashes[path] = file_sha256(path)
+            index[path] = [stat.st_size, stat.st_mtime_ns, hashes[path]]
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with atomic_output(index_path) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(index, f, indent=4)
+    return hashes
+
+def find_sources(source_dir):
+    sources = []
+    for root, _, files in os.walk(source_dir):
+        for name in sorted(files):
+            if name.lower().endswith(SOURCE_EXTENSIONS) and not name.startswith("."):
+                sources.append(os.path.join(root, name))
+    return sorted(sources)
+
+def write_manifest(dest_paths, output_root):
+    manifest = {}
+    for source_path, dest_path in sorted(dest_paths.items(), key=lambda item: item[1]):
+        record = read_sidecar(dest_path, TOOL)
+        if record is None:
+            continue
+        manifest[os.path.relpath(dest_path, output_root).replace(os.sep, "/")] = {
+            "source": source_path.replace(os.sep, "/"),
+            "hash": record["output"],
+            "bytes": os.path.getsize(dest_path)
+        }
+
+    manifest_path = os.path.join(output_root, MANIFEST_PATH)
+    content = json.dumps(manifest, indent=4)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            if f.read() == content:
+                return False
+    with atomic_output(manifest_path) as temp_path:
+        with open(temp_path, "w") as f:
+            f.write(content)
+    return True
+
+def build_assets(source_dir=SOURCE_DIR, output_root=OUTPUT_ROOT, workers=None):
+    sources = find_sources(source_dir)
+    if not sources:
+        print(f"[WARN] No sources found in {source_dir}")
+        return {}
+
+    hashes = hash_sources(sources)
+    dest_paths = {
+        path: os.path.join(output_root, os.path.splitext(os.path.relpath(path, source_dir))[0] + ".gif")
+        for path in sources
+    }
+    print(f"🏗️ Building {len(sources)} asset(s) from {source_dir}")
+    results = run_batch(build_target, [(path, hashes[path], dest_paths[path]) for path in sources], workers)
+
+    if write_manifest(dest_paths, output_root):
+        print(f"📝 Updated {MANIFEST_PATH}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally build emote/VFX GIFs from source clips")
+    parser.add_argument("--sources", default=SOURCE_DIR, help="folder of <set>/<name>.mp4|gif sources")
+    parser.add_argument("--output-root", default=OUTPUT_ROOT, help="where <set>/ folders are written")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    args = parser.parse_args()
+    build_assets(args.sources, args.output_root, args.workers)
@@ -1,9 +1,95 @@
 import os
 from PIL import Image, ImageSequence
 import numpy as np
+from gif_blocks import (
+    read_gif_blocks, write_gif_blocks, decode_frame_indices, encode_frame_indices,
+    palette_bits, with_transparency
+)
+from batch_runner import atomic_output, file_sha256, is_up_to_date, write_sidecar, run_batch
 
-def remove_black_lines_from_gif(input_path, threshold=40):
-    gif = Image.open(input_path)
+TOOL = "clean"
+
+# --------------------------
+# Palette-domain cleaning
+# --------------------------
+
+def build_palette_remap(palette, transparency, threshold):
+    # Work out once per palette which entries are "black" and where they should point
+    pal = np.frombuffer(palette, dtype=np.uint8).reshape(-1, 3)
+    dark = np.flatnonzero(np.all(pal < threshold, axis=1))
+    if transparency is not None:
+        dark = dark[dark != transparency]
+    if dark.size == 0:
+        return None, transparency
+
+    # Reuse the existing transparent slot, otherwise turn the first dark entry into it
+    target = transparency if transparency is not None else int(dark[0])
+    lut = np.arange(256, dtype=np.uint8)
+    lut[dark] = target
+    needs_remap = bool((dark != target).any())
+    return (lut if needs_remap else None), target
+
+def crop_to_opaque(box, indices, transparent):
+    # Every frame is disposed to background, so transparent border rows/columns show the
+    # same thing whether or not they are stored: shrink the box to the opaque pixels
+    x, y = box[:2]
+    rows = np.flatnonzero((indices != transparent).any(axis=1))
+    cols = np.flatnonzero((indices != transparent).any(axis=0))
+    if rows.size == 0:
+        return (x, y, 1, 1), indices[:1, :1]
+    top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    box = (x + int(left), y + int(top), int(right - left), int(bottom - top))
+    return box, np.ascontiguousarray(indices[top:bottom, left:right])
+
+def clean_gif_palette(data, threshold):
+    lsd, global_palette, items = read_gif_blocks(data)
+    frames = [item for item in items if isinstance(item, dict)]
+
+    # Transparent pixels only mean "empty" if every frame is cleared before the next one
+    if len(frames) > 1 and any(frame["disposal"] != 2 for frame in frames):
+        return None
+
+    remaps = {}
+    for frame in frames:
+        palette = frame["palette"] or global_palette
+        if palette is None:
+            return None
+        key = (palette, frame["transparency"])
+        if key not in remaps:
+            remaps[key] = build_palette_remap(palette, frame["transparency"], threshold)
+        lut, target = remaps[key]
+
+        if lut is not None:
+            indices = decode_frame_indices(frame, palette)
+            remapped = lut[indices]
+            if not np.array_equal(remapped, indices):
+                frame["box"], cropped = crop_to_opaque(frame["box"], remapped, target)
+                image = encode_frame_indices(cropped, palette, target, optimize=False)[1]
+                frame["gce"] = with_transparency(frame["gce"], target)
+                # Same table as before: a frame that used the global one keeps no local copy
+                frame["flags"] = (0x80 | palette_bits(palette)) if frame["palette"] else 0
+                frame["image"] = image
+                continue
+
+        # No pixel needs remapping: at most the transparent flag changes, pixel data untouched
+        if target != frame["transparency"]:
+            frame["gce"] = with_transparency(frame["gce"], target)
+
+    # Promote the first frame's table to global when no frame still relies on the old one
+    if frames and frames[0]["palette"] and all(frame["palette"] for frame in frames[1:]):
+        global_palette = frames[0]["palette"]
+    for frame in frames:
+        if frame["palette"] == global_palette:
+            frame["palette"] = None
+            frame["flags"] &= 0x40
+
+    return write_gif_blocks(lsd, global_palette, items)
+
+# --------------------------
+# RGBA fallback
+# --------------------------
+
+def clean_frames_rgba(gif, threshold):
     frames = []
 
     for frame in ImageSequence.Iterator(gif):
@@ -17,26 +103,51 @@ def remove_black_lines_from_gif(input_path, threshold=40):
         cleaned_frame = Image.fromarray(data, 'RGBA')
         frames.append(cleaned_frame)
 
-    # Save back to the same file, replacing it
-    frames[0].save(
-        input_path,
-        save_all=True,
-        append_images=frames[1:],
-        loop=0,
-        transparency=0,
-        disposal=2
-    )
-
-def clean_all_gifs_in_directory(directory="."):
-    for filename in os.listdir(directory):
-        if filename.lower().endswith(".gif"):
-            input_path = os.path.join(directory, filename)
-            try:
-                print(f"🛠️ Processing: {filename}")
-                remove_black_lines_from_gif(input_path)
-                print(f"✅ Cleaned and replaced {filename}\n")
-            except Exception as e:
-                print(f"❌ Failed to process {filename}: {e}\n")
+    return frames
+
+def remove_black_lines_from_gif(input_path, threshold=40, palette=True):
+    # Fast path: remap palette indices directly, no RGBA round-trip or re-quantization
+    if palette:
+        with open(input_path, "rb") as f:
+            cleaned = clean_gif_palette(f.read(), threshold)
+        if cleaned is not None:
+            with atomic_output(input_path) as temp_path:
+                with open(temp_path, "wb") as f:
+                    f.write(cleaned)
+            return "palette"
+
+    with Image.open(input_path) as gif:
+        frames = clean_frames_rgba(gif, threshold)
+
+    # Save back to the same file via a temp file, so a crash never leaves a half-written GIF
+    with atomic_output(input_path) as temp_path:
+        frames[0].save(
+            temp_path,
+            save_all=True,
+            append_images=frames[1:],
+            loop=0,
+            transparency=0,
+            disposal=2
+        )
+    return "rgba"
+
+def clean_gif_if_changed(input_path, threshold=40):
+    params = {"threshold": threshold}
+    before = file_sha256(input_path)
+    if is_up_to_date(input_path, None, params, TOOL, before):
+        return "unchanged, skipped"
+    path_used = remove_black_lines_from_gif(input_path, threshold)
+    write_sidecar(input_path, None, params, TOOL, before)
+    return f"cleaned and replaced ({path_used} path)"
+
+def clean_all_gifs_in_directory(directory=".", threshold=40, workers=None):
+    jobs = [
+        (os.path.join(directory, filename), threshold)
+        for filename in sorted(os.listdir(directory))
+        if filename.lower().endswith(".gif") and not filename.startswith(".")
+    ]
+    print(f"🛠️ Processing {len(jobs)} GIF(s) in {directory}")
+    return run_batch(clean_gif_if_changed, jobs, workers)
 
 if __name__ == "__main__":
-    clean_all_gifs_in_directory()
\ No newline at end of file
+    clean_all_gifs_in_directory()
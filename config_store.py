@@ -0,0 +1,139 @@
+# Write-behind JSON config store: edits mark the store dirty, a short single-shot timer
+# coalesces them into one write, and the write itself (temp file + rename) runs on a
+# background thread so dragging an overlay never waits on the disk.
+#
+# watch() adds hot reload: edits made by other processes (vfx_editor.py) are parsed on
+# the same background thread and announced with reloaded(old, new) on the GUI thread.
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtCore import QObject, QTimer, QCoreApplication, QFileSystemWatcher, Signal
+from batch_runner import atomic_output
+
+SAVE_DELAY_MS = 500
+RELOAD_DELAY_MS = 200        # editors often write in several steps; wait for the last one
+
+
+class ConfigStore(QObject):
+    reloaded = Signal(object, object)     # old data, new data (same dict object as self.data)
+    _parsed = Signal(object, str)
+
+    def __init__(self, path, parent=None, default=None, delay=SAVE_DELAY_MS):
+        super().__init__(parent)
+        self.path = path
+        self.data = self.load(default)
+        self.dirty = False
+        self.last_written = None      # text of the last write, to tell our writes from others'
+
+        # One worker keeps writes in order; a newer snapshot always lands last
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="config-writer")
+        self.pending = None
+
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(delay)
+        self.save_timer.timeout.connect(self.flush)
+
+        self.watcher = None
+        self._parsed.connect(self._apply_reload)
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    def load(self, default=None):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                return json.load(f)
+        return default if default is not None else {}
+
+    def mark_dirty(self):
+        # (Re)start the timer: a burst of edits ends up as a single write
+        self.dirty = True
+        self.save_timer.start()
+
+    def flush(self, wait=False):
+        self.save_timer.stop()
+        if self.dirty:
+            self.dirty = False
+            # Serialize on the GUI thread so the writer gets a consistent snapshot
+            text = json.dumps(self.data, indent=4)
+            if text != self.last_written:
+                self.last_written = text
+                if self.writer is None:
+                    self._write(text)         # already closed: write synchronously
+                else:
+                    self.pending = self.writer.submit(self._write, text)
+        if wait and self.pending is not None:
+            self.pending.result()
+
+    def _write(self, text):
+        try:
+            with atomic_output(self.path) as temp_path:
+                with open(temp_path, "w") as f:
+                    f.write(text)
+        except OSError as e:
+            print(f"[WARN] ConfigStore: could not save {self.path}: {e}")
+
+    # -------- Hot reload --------
+
+    def watch(self, delay=RELOAD_DELAY_MS):
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPath(os.path.dirname(os.path.abspath(self.path)))
+        self._watch_file()
+        self.watcher.fileChanged.connect(self._schedule_reload)
+        self.watcher.directoryChanged.connect(self._directory_changed)
+
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(delay)
+        self.reload_timer.timeout.connect(self._start_reload)
+
+    def _watch_file(self):
+        # A rename-over replaces the inode and silently drops the file watch; re-add it
+        path = os.path.abspath(self.path)
+        if os.path.exists(path) and path not in self.watcher.files():
+            self.watcher.addPath(path)
+
+    def _directory_changed(self, _):
+        # Only interesting when the config was (re)created since we last looked
+        if os.path.abspath(self.path) not in self.watcher.files():
+            self._schedule_reload()
+
+    def _schedule_reload(self, *_):
+        self.reload_timer.start()
+
+    def _start_reload(self):
+        self._watch_file()
+        if self.writer is not None:
+            self.writer.submit(self._read)
+
+    def _read(self):
+        # Runs on the writer thread, so it never races our own pending write
+        try:
+            with open(self.path, "r") as f:
+                text = f.read()
+            data = json.loads(text)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] ConfigStore: ignoring unreadable {self.path}: {e}")
+            return
+        self._parsed.emit(data, text)
+
+    def _apply_reload(self, data, text):
+        if text == self.last_written:
+            return                        # our own write coming back
+        self.last_written = text
+        # The other process saved last, so its version wins over unsaved local edits
+        self.save_timer.stop()
+        self.dirty = False
+        old = dict(self.data)
+        self.data.clear()
+        self.data.update(data)            # in place: everyone holding self.data sees it
+        self.reloaded.emit(old, self.data)
+
+    def close(self):
+        self.flush(wait=True)
+        if self.writer is not None:
+            self.writer.shutdown(wait=True)
+            self.writer = None
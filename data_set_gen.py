@@ -1,22 +1,30 @@
-import requests
-from bs4 import BeautifulSoup
+import os
 import json
 import random
+import argparse
+from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from wiki_fetch import fetch_pages, CACHE_DIR, MAX_AGE
 
 # --------------------------
 # STEP 1: WIKI SCRAPING
 # --------------------------
 
-url = "https://onepunchman.fandom.com/wiki/Genos"
-html = requests.get(url).text
-soup = BeautifulSoup(html, "html.parser")
+WIKI_URL = "https://onepunchman.fandom.com/wiki/Genos"
+WIKI_PAGES = [WIKI_URL]
+FALLBACK_INTRO = "Genos is a 19-year-old cyborg hero and disciple of Saitama. He is driven by justice and vengeance."
+
+def extract_intro(html):
+    soup = BeautifulSoup(html, "html.parser")
 
-# Get first paragraph from article as Genos intro
-intro = soup.select_one("#mw-content-text > div > p")
-if intro:
-    intro_text = intro.get_text().strip()
-else:
-    intro_text = "Genos is a 19-year-old cyborg hero and disciple of Saitama. He is driven by justice and vengeance."
+    # Get first paragraph from article as Genos intro
+    intro = soup.select_one("#mw-content-text > div > p")
+    return intro.get_text().strip() if intro else None
+
+def fetch_intros(urls=WIKI_PAGES, cache_dir=CACHE_DIR, offline=False, max_age=MAX_AGE):
+    pages = fetch_pages(urls, cache_dir=cache_dir, offline=offline, max_age=max_age)
+    intros = [extract_intro(pages[url]) for url in urls if pages.get(url)]
+    return [intro for intro in intros if intro] or [FALLBACK_INTRO]
 
 # --------------------------
 # STEP 2: DATA SETUP
@@ -66,54 +74,115 @@ user_templates = [
 # STEP 3: PROMPT GENERATION
 # --------------------------
 
-entries = []
-
-for _ in range(1100):
-    mode = random.choice(modes)
-    emotion = random.choice(emotions)
-    trait = random.choice(traits)
-    ability = random.choice(abilities)
-    user_template = random.choice(user_templates)
-
-    # Format if template includes ability slot
-    user_input = user_template.format(ability) if "{}" in user_template else user_template
-
-    input_tags = f"<mode:{mode}> <emotion:{emotion}>"
-    output_tags = f"{trigger_templates.get(emotion, '<set_emote:neutral>')} {trigger_templates.get(mode, '')}".strip()
-
-    # Response generation
-    if "ability" in user_input:
-        output = f"I will now demonstrate my {ability} capability. {output_tags}"
-    elif "Saitama" in user_input:
-        output = "Saitama-sensei is unmatched. I continue to learn from him. " + output_tags
-    elif "past" in user_input:
-        output = "My past fuels my resolve. I will not repeat the same mistakes. " + output_tags
-    elif "personality" in user_input:
-        output = f"My programming emphasizes {trait} traits. {output_tags}"
-    elif "mission" in user_input:
-        output = "My directive is to eliminate evil and protect the innocent. " + output_tags
-    elif "Relax" in user_input:
-        output = "Acknowledged. Reducing output to standby levels. <transform:base> <set_emote:neutral>"
-    else:
-        output = f"{intro_text[:100]}... {output_tags}"
-
-    # Trim if too long
-    if len(output) > 300:
-        output = output[:297] + "..."
-
-    entries.append({
-        "instruction": f"You: {user_input}",
-        "input": input_tags,
-        "output": f"Genos: {output.strip()}"
-    })
+def generate_entries(count, rng, intro_texts):
+    # Lazily yields examples; `rng` is a random.Random so runs are reproducible
+    for _ in range(count):
+        mode = rng.choice(modes)
+        emotion = rng.choice(emotions)
+        trait = rng.choice(traits)
+        ability = rng.choice(abilities)
+        user_template = rng.choice(user_templates)
+
+        # Format if template includes ability slot
+        user_input = user_template.format(ability) if "{}" in user_template else user_template
+
+        input_tags = f"<mode:{mode}> <emotion:{emotion}>"
+        output_tags = f"{trigger_templates.get(emotion, '<set_emote:neutral>')} {trigger_templates.get(mode, '')}".strip()
+
+        # Response generation
+        if "ability" in user_input:
+            output = f"I will now demonstrate my {ability} capability. {output_tags}"
+        elif "Saitama" in user_input:
+            output = "Saitama-sensei is unmatched. I continue to learn from him. " + output_tags
+        elif "past" in user_input:
+            output = "My past fuels my resolve. I will not repeat the same mistakes. " + output_tags
+        elif "personality" in user_input:
+            output = f"My programming emphasizes {trait} traits. {output_tags}"
+        elif "mission" in user_input:
+            output = "My directive is to eliminate evil and protect the innocent. " + output_tags
+        elif "Relax" in user_input:
+            output = "Acknowledged. Reducing output to standby levels. <transform:base> <set_emote:neutral>"
+        else:
+            # Only draw from rng with several pages, so single-page runs keep their seeds
+            intro_text = intro_texts[0] if len(intro_texts) == 1 else rng.choice(intro_texts)
+            output = f"{intro_text[:100]}... {output_tags}"
+
+        # Trim if too long
+        if len(output) > 300:
+            output = output[:297] + "..."
+
+        yield {
+            "instruction": f"You: {user_input}",
+            "input": input_tags,
+            "output": f"Genos: {output.strip()}",
+            # Raw user template (ability slot unfilled), for per-template coverage reports
+            "template": user_template
+        }
 
 # --------------------------
-# STEP 4: SAVE TO JSONL
+# STEP 4: SAVE TO JSONL (streamed, sharded)
 # --------------------------
 
-output_path = "genos_generated_from_wiki.jsonl"
-with open(output_path, "w", encoding="utf-8") as f:
-    for e in entries:
-        f.write(json.dumps(e) + "\n")
-
-print(f"✅ Generated {len(entries)} prompts and saved to {output_path}")
+DEFAULT_OUTPUT = "genos_generated_from_wiki.jsonl"
+DEFAULT_COUNT = 1100
+
+def shard_seed(seed, shard):
+    # String seeds are hashed deterministically by random.Random
+    return f"{seed}:{shard}"
+
+def shard_path(output_path, shard, shards):
+    root, ext = os.path.splitext(output_path)
+    return f"{root}-{shard:05d}-of-{shards:05d}{ext}"
+
+def shard_sizes(count, shards):
+    base, extra = divmod(count, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+def write_shard(path, count, seed, shard, intro_texts):
+    rng = random.Random(shard_seed(seed, shard))
+    with open(path, "w", encoding="utf-8") as f:
+        for e in generate_entries(count, rng, intro_texts):
+            f.write(json.dumps(e) + "\n")
+    return count
+
+def generate_dataset(count, seed, output_path, shards=1, workers=None, intro_texts=(FALLBACK_INTRO,), merge=True):
+    intro_texts = list(intro_texts)
+    if shards <= 1:
+        return write_shard(output_path, count, seed, 0, intro_texts)
+
+    paths = [shard_path(output_path, i, shards) for i in range(shards)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(write_shard, path, size, seed, i, intro_texts)
+            for i, (path, size) in enumerate(zip(paths, shard_sizes(count, shards)))
+        ]
+        written = sum(future.result() for future in futures)
+
+    if merge:
+        # Concatenate in shard order so the merged file is deterministic too
+        with open(output_path, "wb") as out:
+            for path in paths:
+                with open(path, "rb") as f:
+                    while chunk := f.read(1 << 20):
+                        out.write(chunk)
+                os.remove(path)
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the Genos instruction dataset as JSONL")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="number of examples")
+    parser.add_argument("--seed", type=int, default=None, help="random seed (printed if omitted)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="output JSONL path")
+    parser.add_argument("--shards", type=int, default=1, help="generate in N shards across processes")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    parser.add_argument("--no-merge", action="store_true", help="keep per-shard files instead of one JSONL")
+    parser.add_argument("--page", action="append", default=None, help="wiki page URL to scrape (repeatable)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="HTTP cache / offline snapshot folder")
+    parser.add_argument("--offline", action="store_true", help="never touch the network; read pages from --cache-dir")
+    parser.add_argument("--refresh", action="store_true", help="revalidate cached pages even if they are fresh")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 32)
+    intro_texts = fetch_intros(args.page or WIKI_PAGES, args.cache_dir, args.offline, 0 if args.refresh else MAX_AGE)
+    written = generate_dataset(args.count, seed, args.output, args.shards, args.workers, intro_texts, not args.no_merge)
+    print(f"✅ Generated {written} prompts (seed={seed}) and saved to {args.output}")
@@ -0,0 +1,157 @@
+# Streaming dedup + coverage report for the generated JSONL datasets
+#
+# One streaming pass: exact duplicates are dropped by content hash, near duplicates by
+# MinHash signatures bucketed with LSH (bands x rows). A row sharing a band with a kept
+# row is only dropped if their signatures agree on at least SIMILARITY of the hashes.
+# Only hashes, signatures and band keys of kept rows stay in memory, never the rows.
+
+import re
+import json
+import zlib
+import hashlib
+import argparse
+from collections import defaultdict
+import numpy as np
+
+PRIME = 4294967291           # largest prime below 2**32, keeps a*x+b inside uint64
+NUM_PERM = 64
+BANDS = 8                    # 8 bands x 8 rows ~ flags pairs above ~0.77 Jaccard
+SIMILARITY = 0.8             # estimated Jaccard at which an LSH candidate is a duplicate
+SHINGLE_SIZE = 3
+BATCH_SIZE = 4096
+
+TAG_RE = re.compile(r"<(mode|emotion):([^>]+)>")
+WORD_RE = re.compile(r"\w+|<[^>]+>")
+
+def row_text(row):
+    return " ".join(str(row.get(k, "")) for k in ("instruction", "input", "output"))
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    return [zlib.crc32(" ".join(words[i:i + size]).encode()) for i in range(len(words) - size + 1)]
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    def signatures(self, shingle_lists):
+        # All shingles of the batch in one matrix, then a segmented min per row
+        offsets = np.cumsum([0] + [len(s) for s in shingle_lists[:-1]])
+        flat = np.fromiter((h for s in shingle_lists for h in s), dtype=np.uint64)
+        hashed = (self.a * flat[None, :] + self.b) % PRIME
+        return np.minimum.reduceat(hashed, offsets, axis=1).T.astype(np.uint32)
+
+def band_keys(signature, bands):
+    rows = len(signature) // bands
+    return [
+        hashlib.blake2b(bytes([i]) + signature[i * rows:(i + 1) * rows].tobytes(), digest_size=8).digest()
+        for i in range(bands)
+    ]
+
+def read_batches(path, batch_size=BATCH_SIZE):
+    batch = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                batch.append((line, json.loads(line)))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+def coverage_key(row):
+    tags = dict(TAG_RE.findall(row.get("input", "")))
+    # data_set_gen writes the raw template; older files only have the filled-in instruction
+    template = row.get("template", row.get("instruction", ""))
+    return tags.get("emotion", "?"), tags.get("mode", "?"), template
+
+def dedup_dataset(input_path, output_path, report_path=None, num_perm=NUM_PERM, bands=BANDS, near=True,
+                  similarity=SIMILARITY):
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    hasher = MinHasher(num_perm)
+    seen_exact = set()
+    kept_signatures = []          # signature of every kept row, by kept-row number
+    band_index = defaultdict(list)  # band key -> kept-row numbers
+    stats = {"rows_in": 0, "rows_out": 0, "exact_duplicates": 0, "near_duplicates": 0}
+    if near:
+        stats["near_similarity"] = similarity
+    coverage = {name: defaultdict(lambda: [0, 0]) for name in ("emotion", "mode", "template")}
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        for batch in read_batches(input_path):
+            texts = [row_text(row) for _, row in batch]
+            signatures = hasher.signatures([shingle_hashes(t) for t in texts]) if near else None
+
+            for i, (line, row) in enumerate(batch):
+                stats["rows_in"] += 1
+                emotion, mode, template = coverage_key(row)
+                for name, value in (("emotion", emotion), ("mode", mode), ("template", template)):
+                    coverage[name][value][0] += 1
+
+                digest = hashlib.blake2b(texts[i].encode(), digest_size=16).digest()
+                if digest in seen_exact:
+                    stats["exact_duplicates"] += 1
+                    continue
+                seen_exact.add(digest)
+
+                if near:
+                    # Band collisions are only candidates: confirm on the estimated Jaccard
+                    signature = signatures[i]
+                    keys = band_keys(signature, bands)
+                    candidates = {j for key in keys for j in band_index.get(key, ())}
+                    if any((signature == kept_signatures[j]).mean() >= similarity for j in candidates):
+                        stats["near_duplicates"] += 1
+                        continue
+                    for key in keys:
+                        band_index[key].append(len(kept_signatures))
+                    kept_signatures.append(signature)
+
+                out.write(line if line.endswith("\n") else line + "\n")
+                stats["rows_out"] += 1
+                for name, value in (("emotion", emotion), ("mode", mode), ("template", template)):
+                    coverage[name][value][1] += 1
+
+    report = dict(stats)
+    report["coverage"] = {
+        name: {value: {"before": counts[0], "after": counts[1]} for value, counts in sorted(values.items())}
+        for name, values in coverage.items()
+    }
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    return report
+
+def print_report(report):
+    kept = report["rows_out"] / max(1, report["rows_in"])
+    near = f" (similarity >= {report['near_similarity']})" if "near_similarity" in report else ""
+    print(f"✅ Kept {report['rows_out']} / {report['rows_in']} rows ({kept:.1%}); "
+          f"{report['exact_duplicates']} exact, {report['near_duplicates']} near duplicates{near} removed")
+    for name in ("emotion", "mode"):
+        parts = [f"{value}={c['after']}/{c['before']}" for value, c in report["coverage"][name].items()]
+        print(f"   {name}: " + ", ".join(parts))
+    print(f"   templates covered: {sum(1 for c in report['coverage']['template'].values() if c['after'])}"
+          f" / {len(report['coverage']['template'])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drop exact and near-duplicate rows from a JSONL dataset")
+    parser.add_argument("input", help="input JSONL")
+    parser.add_argument("--output", default=None, help="deduplicated JSONL (default: <input>.dedup.jsonl)")
+    parser.add_argument("--report", default=None, help="write coverage report JSON here")
+    parser.add_argument("--num-perm", type=int, default=NUM_PERM)
+    parser.add_argument("--bands", type=int, default=BANDS)
+    parser.add_argument("--similarity", type=float, default=SIMILARITY,
+                        help="estimated Jaccard at which a row counts as a near duplicate")
+    parser.add_argument("--exact-only", action="store_true", help="skip MinHash/LSH near-duplicate detection")
+    args = parser.parse_args()
+
+    output = args.output or args.input.rsplit(".", 1)[0] + ".dedup.jsonl"
+    report = dedup_dataset(args.input, output, args.report, args.num_perm, args.bands, not args.exact_only,
+                           args.similarity)
+    print_report(report)
+    print(f"💾 Saved to {output}")
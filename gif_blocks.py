@@ -0,0 +1,158 @@
+# GIF block reader/writer shared by the asset tools (works on raw blocks, no compositing)
+
+import io
+import struct
+from PIL import Image
+import numpy as np
+
+def skip_sub_blocks(data, pos):
+    while data[pos]:
+        pos += data[pos] + 1
+    return pos + 1
+
+def read_gif_blocks(data):
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        raise ValueError("not a GIF file")
+
+    packed = data[10]
+    pos = 13
+    global_palette = None
+    if packed & 0x80:
+        size = 3 << ((packed & 0x07) + 1)
+        global_palette = data[pos:pos + size]
+        pos += size
+
+    items = []   # raw extension bytes or frame dicts, in file order
+    gce = None
+    while pos < len(data):
+        block = data[pos]
+        if block == 0x3B:
+            break
+        elif block == 0x21:
+            end = skip_sub_blocks(data, pos + 2)
+            if data[pos + 1] == 0xF9:
+                gce = data[pos:end]
+            else:
+                items.append(data[pos:end])
+            pos = end
+        elif block == 0x2C:
+            x, y, w, h, flags = struct.unpack("<HHHHB", data[pos + 1:pos + 10])
+            pos += 10
+            palette = None
+            if flags & 0x80:
+                size = 3 << ((flags & 0x07) + 1)
+                palette = data[pos:pos + size]
+                pos += size
+            end = skip_sub_blocks(data, pos + 1)
+            items.append({
+                "gce": gce,
+                "disposal": (gce[3] >> 2) & 0x07 if gce else 0,
+                "transparency": gce[6] if gce and gce[3] & 0x01 else None,
+                "box": (x, y, w, h),
+                "flags": flags,
+                "palette": palette,
+                "image": data[pos:end],
+            })
+            gce = None
+            pos = end
+        else:
+            raise ValueError(f"unexpected GIF block 0x{block:02x} at {pos}")
+
+    return data[6:13], global_palette, items
+
+def palette_bits(palette):
+    return (len(palette) // 3).bit_length() - 2
+
+def decode_frame_indices(frame, palette):
+    # Wrap the frame's raw LZW data in a one-frame GIF so Pillow decodes just the index buffer
+    x, y, w, h = frame["box"]
+    single = (
+        b"GIF89a" + struct.pack("<HHBBB", w, h, 0x80 | palette_bits(palette), 0, 0) + palette
+        + b"\x2c" + struct.pack("<HHHHB", 0, 0, w, h, frame["flags"] & 0x40)
+        + frame["image"] + b"\x3b"
+    )
+    return np.asarray(Image.open(io.BytesIO(single)))
+
+def encode_single_frame(image, **params):
+    buf = io.BytesIO()
+    image.save(buf, "GIF", interlace=False, **params)
+
+    # Pillow drops unused palette entries, so the transparent index may have moved
+    _, global_palette, items = read_gif_blocks(buf.getvalue())
+    frame = next(item for item in items if isinstance(item, dict))
+    return frame["palette"] or global_palette, frame["image"], frame["transparency"]
+
+def encode_frame_indices(indices, palette, transparency, optimize=True):
+    # optimize=False keeps the table and index values as given, so the frame can go on
+    # using the table it was decoded with (usually the global one) instead of a local copy
+    out = Image.fromarray(indices, "P")
+    out.putpalette(palette)
+    return encode_single_frame(out, optimize=optimize, transparency=transparency)
+
+def with_transparency(gce, transparency):
+    gce = gce or b"\x21\xf9\x04\x00\x00\x00\x00\x00"
+    if transparency is None:
+        return gce
+    return gce[:3] + bytes([gce[3] | 0x01]) + gce[4:6] + bytes([transparency]) + gce[7:]
+
+def write_gif_blocks(lsd, global_palette, items):
+    packed = lsd[4] & 0x70
+    if global_palette:
+        packed |= 0x80 | palette_bits(global_palette)
+    out = bytearray(b"GIF89a" + lsd[:4] + bytes([packed]) + lsd[5:] + (global_palette or b""))
+
+    for item in items:
+        if not isinstance(item, dict):
+            out += item
+            continue
+        out += item["gce"] or b""
+        out += b"\x2c" + struct.pack("<HHHHB", *item["box"], item["flags"])
+        out += (item["palette"] or b"") + item["image"]
+
+    out += b"\x3b"
+    return bytes(out)
+
+def graphic_control(delay_ms, transparency=None, disposal=2):
+    packed = (disposal << 2) | (0x01 if transparency is not None else 0)
+    delay = max(1, round(delay_ms / 10))   # GIF delays are in centiseconds
+    return b"\x21\xf9\x04" + struct.pack("<BHB", packed, delay, transparency or 0) + b"\x00"
+
+class GifStreamWriter:
+    # Writes frames straight to disk as they arrive, so only one frame is ever held in memory
+
+    def __init__(self, path, size, delay_ms=100, loop=0, palette=None, background=0):
+        self.size = size
+        self.delay_ms = delay_ms
+        self.palette = palette
+        self.frame_count = 0
+        self.f = open(path, "wb")
+        packed = 0x70 | (0x80 | palette_bits(palette) if palette else 0)
+        self.f.write(b"GIF89a" + struct.pack("<HHBBB", size[0], size[1], packed, background, 0))
+        self.f.write(palette or b"")
+        self.f.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\x00")
+
+    def add_frame(self, image, delay_ms=None):
+        palette, data, transparency = encode_single_frame(image, optimize=True)
+        self.write_frame(palette, data, transparency, (0, 0) + self.size, delay_ms)
+
+    def write_frame(self, palette, data, transparency, box, delay_ms=None, disposal=2):
+        # Frames using the global table are written without a local one
+        if palette == self.palette:
+            palette = b""
+        self.f.write(graphic_control(delay_ms or self.delay_ms, transparency, disposal))
+        flags = (0x80 | palette_bits(palette)) if palette else 0
+        self.f.write(b"\x2c" + struct.pack("<HHHHB", *box, flags))
+        self.f.write(palette)
+        self.f.write(data)
+        self.frame_count += 1
+
+    def close(self):
+        if not self.f.closed:
+            self.f.write(b"\x3b")
+            self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,24 +2,37 @@
 
 import os
 import sys
-import json
 import random
-import torch
-import pygame
-import psutil
-import pyttsx3
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
-from huggingface_hub import login
-from peft import PeftModel
+import argparse
+import threading
+from startup_profiler import StartupProfiler, REPORT_PATH
+from model_snapshot import resolve_model, SNAPSHOT_DIR
+from turn_tracer import TurnTracer, TraceHud
+from render_profiler import RenderProfiler, REPORT_PATH as RENDER_REPORT_PATH
+from memory_telemetry import MemoryTelemetry, MemoryPanel
+from power_monitor import PowerMonitor
+from transcript import TranscriptView
 # PySide6 Core and GUI essentials
-from PySide6.QtCore import Qt, QTimer, QEvent, QPointF
-from PySide6.QtGui import QMovie, QColor, QPen
+from PySide6.QtCore import Qt, QTimer, QEvent, QPointF, QObject, Signal
+from PySide6.QtGui import QMovie, QColor, QPen, QKeySequence, QShortcut
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QTextEdit, QPushButton, QLabel, QVBoxLayout, QWidget,
     QMessageBox, QSlider, QGraphicsOpacityEffect,
     QGraphicsView, QGraphicsScene, QGraphicsProxyWidget, QGraphicsRectItem,
     QHBoxLayout, QSpinBox, QGraphicsItem
 )
+from animation_scheduler import AnimationScheduler
+from config_store import ConfigStore
+from undo_history import UndoHistory
+from vfx_layout import VfxLayout, to_percent, diff_states
+
+# torch / transformers / peft, pygame and pyttsx3 are imported by the subsystems that use
+# them, after the window is up; see load_language_model, init_audio and init_tts
+startup = StartupProfiler()
+startup.mark("imports")
+tracer = TurnTracer()
+pygame = None
+engine = None
 
 
 # -------- Resource path for PyInstaller compatibility --------
@@ -72,42 +85,93 @@ GENOS_EMOTE_SETS = {
     }
 }
 
-# Load token
-with open(token_file, "r") as f:
-    hf_token = f.read().strip()
-login(token=hf_token)
-
-# Load model
-tokenizer = AutoTokenizer.from_pretrained(model_name, token=hf_token)
-quant_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_compute_dtype=torch.float16,
-    bnb_4bit_use_double_quant=True,
-    bnb_4bit_quant_type="nf4"
-)
-
-base_model = AutoModelForCausalLM.from_pretrained(
-    model_name,
-    device_map="auto",
-    quantization_config=quant_config,
-    trust_remote_code=True,
-    token=hf_token
-)
 adapter_path = os.path.join(os.path.dirname(__file__), resource_path("genos_lora_adapter"))
-model = PeftModel.from_pretrained(base_model, adapter_path)
-device = 0 if torch.cuda.is_available() else -1
-
-# Init TTS
-try:
-    engine = pyttsx3.init()
-    engine.setProperty("rate", 170)
-    engine.setProperty("voice", "english-us")
-except Exception as e:
-    engine = None
-    print(f"Warning: TTS engine failed to initialize: {e}")
+snapshot_path = resource_path(SNAPSHOT_DIR)
+
+# -------- Lazily initialized subsystems --------
+
+def load_language_model(profiler=startup, snapshot_dir=snapshot_path, allow_network=False):
+    # Prefer the pinned local snapshot; the hub is only contacted with allow_network
+    with profiler.phase("resolve model snapshot"):
+        source = resolve_model(snapshot_dir, model_name, adapter_path, allow_network, token_file)
+    hf_token = source["token"]
+
+    torch = profiler.import_module("torch")
+    transformers = profiler.import_module("transformers")
+    peft = profiler.import_module("peft")
+
+    if not source["offline"] and hf_token:
+        huggingface_hub = profiler.import_module("huggingface_hub")
+        with profiler.phase("hub login"):
+            huggingface_hub.login(token=hf_token)
+
+    # Load model
+    local = {"local_files_only": True} if source["offline"] else {"token": hf_token}
+    with profiler.phase("load tokenizer"):
+        tokenizer = transformers.AutoTokenizer.from_pretrained(source["tokenizer"], **local)
+    quant_config = transformers.BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_compute_dtype=torch.float16,
+        bnb_4bit_use_double_quant=True,
+        bnb_4bit_quant_type="nf4"
+    )
 
-# Init Music
-pygame.mixer.init()
+    with profiler.phase("load base model"):
+        base_model = transformers.AutoModelForCausalLM.from_pretrained(
+            source["base"],
+            device_map="auto",
+            quantization_config=quant_config,
+            trust_remote_code=True,
+            **local
+        )
+    with profiler.phase("load LoRA adapter"):
+        model = peft.PeftModel.from_pretrained(base_model, source["adapter"])
+    return tokenizer, model
+
+def init_tts(profiler=startup):
+    global engine
+    # Init TTS
+    try:
+        pyttsx3 = profiler.import_module("pyttsx3")
+        with profiler.phase("init TTS"):
+            engine = pyttsx3.init()
+            engine.setProperty("rate", 170)
+            engine.setProperty("voice", "english-us")
+    except Exception as e:
+        engine = None
+        print(f"Warning: TTS engine failed to initialize: {e}")
+
+def init_audio(profiler=startup):
+    global pygame
+    # Init Music; without a mixer the assistant runs silent instead of stalling in boot()
+    try:
+        pygame = profiler.import_module("pygame")
+        with profiler.phase("init mixer"):
+            pygame.mixer.init()
+    except Exception as e:
+        pygame = None
+        print(f"Warning: audio mixer failed to initialize: {e}")
+
+class ModelLoader(QObject):
+    # Loads the model on a worker thread; results arrive on the GUI thread via signals
+    loaded = Signal(object, object)
+    failed = Signal(str)
+
+    def __init__(self, parent=None, snapshot_dir=snapshot_path, allow_network=False):
+        super().__init__(parent)
+        self.snapshot_dir = snapshot_dir
+        self.allow_network = allow_network
+
+    def start(self):
+        threading.Thread(target=self.run, name="model-loader", daemon=True).start()
+
+    def run(self):
+        try:
+            tokenizer, model = load_language_model(startup, self.snapshot_dir, self.allow_network)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(tokenizer, model)
 
 # Emotion SFX Mapping (supports multiple variations)
 EMOTION_SFX_MAP = {
@@ -158,6 +222,8 @@ EMOTION_SFX_MAP = {
 def play_ambient_music():
     global current_track_index, ambient_tracks
 
+    if pygame is None:
+        return
     if not ambient_tracks:
         print("No ambient tracks found.")
         return
@@ -172,21 +238,66 @@ def play_ambient_music():
     speak(f"Now playing: {track_name}")
 
 
+# Decoded once per file and reused; bounded by the number of SFX files shipped
+SOUND_CACHE = {}
+
+def play_sound(path):
+    # No mixer (pygame missing or mixer.init() failed): sound effects are skipped
+    if pygame is None:
+        return
+    sound = SOUND_CACHE.get(path)
+    if sound is None:
+        sound = SOUND_CACHE[path] = pygame.mixer.Sound(path)
+    sound.play()
+
 def speak(text):
     if engine:
-        engine.say(text)
-        engine.runAndWait()
+        with tracer.span("speak", chars=len(text)):
+            engine.say(text)
+            engine.runAndWait()
+
+class TokenTimer:
+    # Minimal generate() streamer: the first put() is the prompt, the second the first
+    # new token, which is where prefill ends and decoding starts
+    def __init__(self):
+        self.puts = 0
+        self.first_token = None
+
+    def put(self, value):
+        self.puts += 1
+        if self.puts == 2:
+            self.first_token = tracer.now_ms()
+
+    def end(self):
+        pass
 
 def generate_text(prompt, model, tokenizer, max_new_tokens=100):
-    input_ids = tokenizer(prompt, return_tensors="pt").input_ids.to(model.device)
-    outputs = model.generate(
-        input_ids,
-        max_new_tokens=max_new_tokens,
-        do_sample=True,
-        top_p=0.95,
-        temperature=0.7,
-    )
-    return tokenizer.decode(outputs[0], skip_special_tokens=True)
+    with tracer.span("tokenize"):
+        input_ids = tokenizer(prompt, return_tensors="pt").input_ids.to(model.device)
+
+    timer = TokenTimer()
+    start = tracer.now_ms()
+    with tracer.span("generate", prompt_tokens=int(input_ids.shape[-1])) as span:
+        outputs = model.generate(
+            input_ids,
+            max_new_tokens=max_new_tokens,
+            do_sample=True,
+            top_p=0.95,
+            temperature=0.7,
+            streamer=timer
+        )
+        new_tokens = int(outputs.shape[-1] - input_ids.shape[-1])
+        end = tracer.now_ms()
+        first_token = timer.first_token or end
+        span["new_tokens"] = new_tokens
+        span["prefill_ms"] = round(first_token - start, 2)
+        span["decode_ms"] = round(end - first_token, 2)
+        # First token comes out of prefill; the rest are the decode loop
+        if new_tokens > 1 and end > first_token:
+            span["tokens_per_s"] = round((new_tokens - 1) / ((end - first_token) / 1000), 2)
+
+    with tracer.span("detokenize"):
+        return tokenizer.decode(outputs[0], skip_special_tokens=True)
 
 def detect_emotion(text):
     text = text.lower()
@@ -205,15 +316,15 @@ def detect_emotion(text):
     else:
         return "neutral"
 
-def get_battery_status():
-    battery = psutil.sensors_battery()
-    return battery.percent if battery else 100
-
 # In class GenosChat(QMainWindow):
 class GenosChat(QMainWindow):
-    def __init__(self):
+    boot_finished = Signal(bool)   # True once the model is ready, False if it failed to load
+
+    def __init__(self, snapshot_dir=snapshot_path, allow_network=False):
         super().__init__()
         self.setWindowTitle("Genos Kun")
+        self.snapshot_dir = snapshot_dir
+        self.allow_network = allow_network
         self.resize(1280, 720)
 
         # ===== Scene and View for VFX Layers =====
@@ -233,15 +344,22 @@ class GenosChat(QMainWindow):
         self.proxy_avatar.setZValue(0)
         self.scene.addItem(self.proxy_avatar)
 
+        # ===== Power Monitor (cached battery reads, low battery power profile) =====
+        self.power = PowerMonitor(self)
+        self.power.profile_changed.connect(self.apply_power_policy)
+
+        # ===== Animation Scheduler (pause when hidden, throttle on low battery) =====
+        self.animations = AnimationScheduler(self, self.power.percent)
+        self.animations.track(self.movie)
+
         # ===== VFX Management =====
         self.vfx_proxies = []              # (proxy, gif_name)
         self.active_proxy = None           # currently selected overlay
         self.active_rect_item = None       # bounding box
         self.current_emotion = "neutral"   # current emotion
 
-        # ===== Undo/Redo Stacks =====
-        self.undo_stack = []
-        self.redo_stack = []
+        # ===== Undo/Redo History (per-layer deltas, capped) =====
+        self.history = UndoHistory()
 
         # ===== Control Panel for Direct Edits =====
         self.panel = QWidget()
@@ -293,11 +411,6 @@ class GenosChat(QMainWindow):
         self.rotation_slider.setToolTip("Rotate selected VFX (-180° to 180°)")
         self.opacity_slider.setToolTip("Opacity of selected VFX (0-100%)")
 
-        self.x_spin.valueChanged.connect(self.update_x)
-        self.y_spin.valueChanged.connect(self.update_y)
-        self.w_spin.valueChanged.connect(self.update_w)
-        self.h_spin.valueChanged.connect(self.update_h)
-
         self.grid_size = 10
         
         for widget in [
@@ -316,9 +429,14 @@ class GenosChat(QMainWindow):
         self.input_box.setPlaceholderText("Ask Genos something...")
         self.send_button = QPushButton("Send")
         self.send_button.clicked.connect(self.send_prompt)
+        # Chat is enabled once the model finished loading in boot()
+        self.model = None
+        self.tokenizer = None
+        self.send_button.setEnabled(False)
+        self.send_button.setText("Booting...")
 
-        self.output_box = QTextEdit()
-        self.output_box.setReadOnly(True)
+        # Bounded on screen; the full history is in transcript.log
+        self.output_box = TranscriptView()
 
         # ===== Layout Assembly =====
         main_layout = QVBoxLayout()
@@ -332,15 +450,27 @@ class GenosChat(QMainWindow):
         container.setLayout(main_layout)
         self.setCentralWidget(container)
 
+        # ===== Latency HUD (F3) =====
+        self.trace_hud = TraceHud(tracer, self.view)
+        self.trace_hud.hide()
+        QShortcut(QKeySequence("F3"), self, activated=self.trace_hud.toggle)
+
+        # ===== Render Profiler (opt-in, see enable_render_profiler; F4 writes the report) =====
+        self.render_profiler = None
+        QShortcut(QKeySequence("F4"), self, activated=self.dump_render_profile)
+
         # ===== Music Timer and Ambient Music =====
         self.music_timer = QTimer(self)
         self.music_timer.timeout.connect(self.check_music_end)
-        self.music_timer.start(1000)
-        play_ambient_music()
 
         # ===== Load VFX Config =====
         self.effects_config_file = "effects_config.json"
-        self.effects_config = self.load_effects_config()
+        self.effects_store = ConfigStore(self.effects_config_file, self, default={"states": {}})
+        self.effects_config = self.effects_store.data
+        self.vfx_layout = VfxLayout(self.effects_config)
+        # Pick up vfx_editor.py saves live instead of requiring a restart
+        self.effects_store.reloaded.connect(self.on_effects_reloaded)
+        self.effects_store.watch()
 
         # ===== Transformation States =====
         self.current_mode = "base"
@@ -349,9 +479,6 @@ class GenosChat(QMainWindow):
             "combat": resource_path("assets/eh/genos_combat.gif")
         }
 
-        # ===== Battery Warning =====
-        self.low_battery_warned = False
-
         # ===== Snap-to-grid =====
         self.grid_size = 10
 
@@ -372,10 +499,62 @@ class GenosChat(QMainWindow):
         self.idle_timer.timeout.connect(self.play_idle_quote)
         self.idle_timer.start(90000)  # Every 1.5 minutes
 
-        # ===== Battery Check Timer =====
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.check_battery)
-        self.timer.start(60000)  # Every 60 seconds
+        # ===== Memory Telemetry (F5 shows the panel) =====
+        self.telemetry = MemoryTelemetry(self)
+        counters = {
+            "tracked_movies": lambda: len(self.animations.entries),
+            "vfx_layers": lambda: len(self.vfx_proxies),
+            "cached_sounds": lambda: len(SOUND_CACHE),
+            "transcript_rows": lambda: self.output_box.transcript.rowCount(),
+            "transcript_messages": lambda: self.output_box.transcript.log.count,
+            "undo_depth": lambda: len(self.history.undo_stack) + len(self.history.redo_stack),
+            "compiled_layouts": lambda: len(self.vfx_layout.layouts)
+        }
+        for name, reader in counters.items():
+            self.telemetry.add_counter(name, reader)
+        self.memory_panel = MemoryPanel(self.telemetry, self.view)
+        self.memory_panel.hide()
+        QShortcut(QKeySequence("F5"), self, activated=self.memory_panel.toggle)
+
+    def enable_render_profiler(self):
+        self.render_profiler = RenderProfiler(self.view, lambda: self.current_emotion)
+        self.render_profiler.track(self.proxy_avatar, "avatar")
+        for proxy, gif_name in self.vfx_proxies:
+            self.render_profiler.track(proxy, gif_name)
+
+    def dump_render_profile(self):
+        if self.render_profiler:
+            self.render_profiler.write_report()
+            self.render_profiler.print_summary()
+            print(f"📝 Wrote {RENDER_REPORT_PATH}")
+
+    def boot(self):
+        # Runs once the window is on screen: audio and TTS here, the model on a worker thread
+        startup.mark("window_shown")
+        init_audio()
+        init_tts()
+        self.apply_music_policy()
+        if self.power.profile["ambient_music"]:
+            with startup.phase("start ambient music"):
+                play_ambient_music()
+
+        self.model_loader = ModelLoader(self, self.snapshot_dir, self.allow_network)
+        self.model_loader.loaded.connect(self.on_model_loaded)
+        self.model_loader.failed.connect(self.on_model_failed)
+        self.model_loader.start()
+
+    def on_model_loaded(self, tokenizer, model):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.send_button.setText("Send")
+        self.send_button.setEnabled(True)
+        startup.mark("ready")
+        self.boot_finished.emit(True)
+
+    def on_model_failed(self, error):
+        self.send_button.setText("Model unavailable")
+        self.output_box.append(f"Error: could not load the model: {error}")
+        self.boot_finished.emit(False)
 
     def send_prompt(self):
         prompt = self.input_box.toPlainText().strip()
@@ -387,10 +566,15 @@ class GenosChat(QMainWindow):
         self.output_box.append("Genos: Thinking...")
         QApplication.processEvents()
 
+        with tracer.turn("chat", prompt_chars=len(prompt)):
+            self.run_turn(prompt)
+
+    def run_turn(self, prompt):
         try:
-            result = generate_text(prompt, model, tokenizer)
+            result = generate_text(prompt, self.model, self.tokenizer, self.power.profile["max_new_tokens"])
             combined_text = prompt + " " + result
-            emotion = detect_emotion(combined_text)
+            with tracer.span("detect_emotion"):
+                emotion = detect_emotion(combined_text)
             self.update_emote(emotion)
             self.output_box.append(f"Genos: {result}")
             speak(result)
@@ -426,9 +610,9 @@ class GenosChat(QMainWindow):
         except Exception as e:
             self.output_box.append(f"Error: {str(e)}")
         
+    @tracer.traced("update_emote")
     def update_emote(self, emotion):
-        battery = get_battery_status()
-        if battery < 20:
+        if self.power.profile["weak_emotes"]:
             emote_path = random.choice(list(GENOS_EMOTE_SETS["weak"].values()))
         else:
             # Choose emote set based on current mode
@@ -443,17 +627,23 @@ class GenosChat(QMainWindow):
             
             emote_path = emote_set.get(emotion, emote_set["neutral"])
 
+        self.set_avatar_movie(emote_path)
+
+    def set_avatar_movie(self, path):
         self.movie.stop()
-        self.movie = QMovie(emote_path)
+        self.animations.untrack(self.movie)
+        self.movie = QMovie(path)
         self.avatar_label.setMovie(self.movie)
         self.movie.start()
+        self.animations.track(self.movie)
 
+    @tracer.traced("play_sfx")
     def play_emotion_sfx(self, emotion):
         sound_choices = EMOTION_SFX_MAP.get(emotion)
         if sound_choices:
             sfx_path = random.choice(sound_choices)
             if os.path.exists(sfx_path):
-                pygame.mixer.Sound(sfx_path).play()
+                play_sound(sfx_path)
 
     def apply_vfx(self, state_name):
         self.current_emotion = state_name
@@ -461,15 +651,17 @@ class GenosChat(QMainWindow):
 
     def play_idle_quote(self):
         if engine and self.isActiveWindow():
-            quote = random.choice(self.idle_quotes)
-            speak(quote)
-            self.output_box.append(f"Genos (idle): {quote}")
-
-            # Randomly trigger emotion visuals + sound
-            emotion = random.choice(["neutral", "happy", "vengeful", "defensive", "blush", "goofy", "angry"])
-            self.update_emote(emotion)
-            self.play_emotion_sfx(emotion)
-            self.apply_vfx(emotion)
+            # Only ticks that actually play a quote become a traced turn
+            with tracer.turn("idle"):
+                quote = random.choice(self.idle_quotes)
+                speak(quote)
+                self.output_box.append(f"Genos (idle): {quote}")
+
+                # Randomly trigger emotion visuals + sound
+                emotion = random.choice(["neutral", "happy", "vengeful", "defensive", "blush", "goofy", "angry"])
+                self.update_emote(emotion)
+                self.play_emotion_sfx(emotion)
+                self.apply_vfx(emotion)
             
     def opacity_slider_changed(self, value):
         opacity = value / 100.0
@@ -492,14 +684,30 @@ class GenosChat(QMainWindow):
         self.apply_vfx(emotion)
 
 
-    def check_battery(self):
-        battery = get_battery_status()
-        if battery < 20 and not self.low_battery_warned:
+    def apply_power_policy(self, profile_name):
+        # Called by the power monitor when the battery crosses the low threshold
+        if profile_name == "low":
             sfx_path = os.path.join("assets", "sfx", "low_battery.mp3")
             if os.path.exists(sfx_path):
-                pygame.mixer.Sound(sfx_path).play()
-            self.low_battery_warned = True
-            
+                play_sound(sfx_path)
+        self.output_box.append(f"🔋 Power profile: {profile_name} (battery {self.power.percent()}%)")
+        self.animations.refresh()
+        self.apply_music_policy()
+        self.update_emote(self.current_emotion)
+        # Rebuild overlays under the new layer cap
+        self.load_vfx_layers(self.current_emotion)
+
+    def apply_music_policy(self):
+        if pygame is None:
+            return
+        if self.power.profile["ambient_music"]:
+            pygame.mixer.music.unpause()
+            self.music_timer.start(1000)
+        else:
+            # Stop the track watcher too, or it would take the pause for a finished track
+            self.music_timer.stop()
+            pygame.mixer.music.pause()
+
     def check_music_end(self):
         global current_track_index, ambient_tracks
         if not pygame.mixer.music.get_busy():
@@ -513,14 +721,9 @@ class GenosChat(QMainWindow):
         current_track_index = (current_track_index + 1) % len(ambient_tracks)
         play_ambient_music()
         
-    def load_effects_config(self):
-        if os.path.exists(self.effects_config_file):
-            with open(self.effects_config_file, "r") as f:
-                return json.load(f)
-
     def save_effects_config(self):
-        with open(self.effects_config_file, "w") as f:
-            json.dump(self.effects_config, f, indent=4)
+        # Write-behind: coalesced into one atomic write shortly after the last edit
+        self.effects_store.mark_dirty()
 
     def update_rotation(self, value):
         if self.active_proxy:
@@ -546,19 +749,23 @@ class GenosChat(QMainWindow):
         rect_item.show()
 
         # Defensive: only update controls if the widget exists
-        widget = proxy.widget()
-        if widget:
-            self.x_spin.setValue(int(proxy.pos().x()))
-            self.y_spin.setValue(int(proxy.pos().y()))
-            self.w_spin.setValue(int(widget.width()))
-            self.h_spin.setValue(int(widget.height()))
-            self.rotation_slider.setValue(int(proxy.rotation()))
-            ge = widget.graphicsEffect()
-            opacity = ge.opacity() if ge else 1.0
-            self.opacity_slider.setValue(int(opacity * 100))
+        if proxy.widget():
+            self.sync_controls(proxy)
         else:
             print("[WARN] select_proxy: proxy.widget() is None!")
 
+    def sync_controls(self, proxy):
+        # Show the layer's values without the controls feeding them back as new edits
+        values = self.layer_fields(proxy, ("x", "y", "w", "h", "rotation", "opacity"))
+        controls = [
+            (self.x_spin, values["x"]), (self.y_spin, values["y"]),
+            (self.w_spin, values["w"]), (self.h_spin, values["h"]),
+            (self.rotation_slider, values["rotation"]), (self.opacity_slider, values["opacity"] * 100)
+        ]
+        for control, value in controls:
+            control.blockSignals(True)
+            control.setValue(int(value))
+            control.blockSignals(False)
 
     def snap_value(self, value):
         return self.grid_size * round(value / self.grid_size)
@@ -572,14 +779,12 @@ class GenosChat(QMainWindow):
             handle.setZValue(2)
 
             def resize_proxy(event, h=handle, p=proxy, cx=cx, cy=cy):
-                self.push_undo(self.capture_state())
                 pos = h.pos() + event.pos()
                 new_w = self.snap_value(pos.x()) if cx else p.widget().width()
                 new_h = self.snap_value(pos.y()) if cy else p.widget().height()
-                p.widget().resize(new_w, new_h)
-                self.w_spin.setValue(int(new_w))
-                self.h_spin.setValue(int(new_h))
-                self.save_vfx_state(p, self.get_gif_name_by_proxy(p))
+                self.edit_layer(p, lambda p: p.widget().resize(int(new_w), int(new_h)), ("w", "h"))
+                if p is self.active_proxy:
+                    self.sync_controls(p)
                 event.accept()
 
             handle.mouseMoveEvent = resize_proxy
@@ -592,23 +797,23 @@ class GenosChat(QMainWindow):
     
     def wheelEvent(self, event):
         if QApplication.keyboardModifiers() == Qt.AltModifier and self.active_proxy:
-            self.push_undo(self.capture_state())
             delta_angle = event.angleDelta().y() / 8
-            new_angle = self.active_proxy.rotation() + delta_angle
-            self.active_proxy.setRotation(new_angle)
-            self.rotation_slider.setValue(int(new_angle))
-            self.save_active_proxy_state()
+            self.edit_active_layer(lambda p: p.setRotation(p.rotation() + delta_angle), ("rotation",))
+            self.sync_controls(self.active_proxy)
             
+    @tracer.traced("load_vfx_layers")
     def load_vfx_layers(self, state_name):
         for proxy, _ in self.vfx_proxies:
             self.scene.removeItem(proxy)
         self.vfx_proxies.clear()
-
-        screen_w = self.width()
-        screen_h = self.height()
-
-        state_data = self.effects_config.get("states", {}).get(state_name, {})
-        for gif_name, cfg in state_data.items():
+        self.animations.untrack_overlays()
+        self.active_proxy = None
+        self.active_rect_item = None
+
+        # Pixel geometry comes precompiled for this window size
+        layout = self.vfx_layout.compile(state_name, (self.width(), self.height()))
+        max_layers = self.power.profile["max_vfx_layers"]
+        for gif_name, geometry in list(layout.items())[:max_layers]:
             label = QLabel()
             label.setAlignment(Qt.AlignCenter)
             label.installEventFilter(self)
@@ -623,24 +828,15 @@ class GenosChat(QMainWindow):
             label.setMovie(movie)
             movie.start()
 
-            pos_percent = cfg.get("position_percent", [0.1, 0.1])
-            size_percent = cfg.get("size_percent", [0.3, 0.3])
-            rotation = cfg.get("rotation", 0)
-
-            x = pos_percent[0] * screen_w
-            y = pos_percent[1] * screen_h
-            w = size_percent[0] * screen_w
-            h = size_percent[1] * screen_h
-
-            label.resize(int(w), int(h))
+            label.resize(geometry.w, geometry.h)
 
             proxy = QGraphicsProxyWidget()
             proxy.setWidget(label)  # ✅ CRITICAL!
-            proxy.setPos(QPointF(x, y))
-            proxy.setRotation(rotation)
+            proxy.setPos(QPointF(geometry.x, geometry.y))
+            proxy.setRotation(geometry.rotation)
 
             opacity_effect = QGraphicsOpacityEffect()
-            opacity_effect.setOpacity(cfg.get("opacity", 0.8))
+            opacity_effect.setOpacity(geometry.opacity)
             label.setGraphicsEffect(opacity_effect)
 
             proxy.setFlag(QGraphicsItem.ItemIsMovable, True)
@@ -655,44 +851,93 @@ class GenosChat(QMainWindow):
 
             self.scene.addItem(proxy)
             self.vfx_proxies.append((proxy, gif_name))
+            if self.render_profiler:
+                self.render_profiler.track(proxy, gif_name)
+            self.animations.track(movie, proxy, essential=False)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if hasattr(self, "vfx_layout"):
+            self.relayout_vfx()
+
+    def relayout_vfx(self, layers=None):
+        # One pass over the live layers; the percent config itself does not change.
+        # `layers` names layers whose config changed: those also get rotation/opacity.
+        layout = self.vfx_layout.compile(self.current_emotion, (self.width(), self.height()))
+        for proxy, gif_name in self.vfx_proxies:
+            geometry = layout.get(gif_name)
+            widget = proxy.widget()
+            if geometry is None or widget is None:
+                continue
+            proxy.setPos(QPointF(geometry.x, geometry.y))
+            widget.resize(geometry.w, geometry.h)
+            if layers is not None and gif_name in layers:
+                proxy.setRotation(geometry.rotation)
+                if widget.graphicsEffect():
+                    widget.graphicsEffect().setOpacity(geometry.opacity)
+            for child in proxy.childItems():
+                if isinstance(child, QGraphicsRectItem):
+                    child.setRect(proxy.boundingRect())
+        if self.active_proxy:
+            self.sync_controls(self.active_proxy)
+
+    def on_effects_reloaded(self, old, new):
+        changes = diff_states(old, new)
+        for state_name in changes:
+            self.vfx_layout.invalidate(state_name)
+
+        change = changes.get(self.current_emotion)
+        if change is None:
+            return
+        if change["added"] or change["removed"]:
+            # Layer set changed: rebuild this state's proxies
+            self.load_vfx_layers(self.current_emotion)
+        else:
+            self.relayout_vfx(change["changed"])
+        self.output_box.append(f"🔁 Reloaded VFX for '{self.current_emotion}' from {self.effects_config_file}")
 
     def eventFilter(self, obj, event):
         if isinstance(obj, QLabel) and event.type() in (QEvent.MouseButtonPress, QEvent.MouseMove, QEvent.MouseButtonRelease):
+            proxy = next((p for p, _ in self.vfx_proxies if p.widget() == obj), None)
             if event.type() == QEvent.MouseButtonPress:
                 self.dragging_vfx = True
                 self.drag_offset = event.globalPosition().toPoint() - obj.mapToGlobal(obj.rect().topLeft())
+                # A whole drag becomes one undo entry, recorded on release
+                self.drag_start = self.layer_fields(proxy, ("x", "y")) if proxy else None
                 return True
 
             elif event.type() == QEvent.MouseMove and self.dragging_vfx:
                 new_pos = event.globalPosition().toPoint() - self.drag_offset
                 scene_pos = self.view.mapToScene(self.view.mapFromGlobal(new_pos))
-                proxy = next((p for p, _ in self.vfx_proxies if p.widget() == obj), None)
                 if proxy:
                     proxy.setPos(scene_pos)
-                    self.x_spin.setValue(int(scene_pos.x()))
-                    self.y_spin.setValue(int(scene_pos.y()))
-                    self.save_active_proxy_state()
+                    if proxy is self.active_proxy:
+                        self.sync_controls(proxy)
+                    self.save_vfx_state(proxy, self.get_gif_name_by_proxy(proxy))
                 return True
 
             elif event.type() == QEvent.MouseButtonRelease:
                 self.dragging_vfx = False
-                self.save_active_proxy_state()
+                if proxy and getattr(self, "drag_start", None):
+                    self.history.record(self.layer_id(proxy), self.drag_start,
+                                        self.layer_fields(proxy, ("x", "y")), merge=False)
+                    self.history.break_merge()
+                    self.save_vfx_state(proxy, self.get_gif_name_by_proxy(proxy))
+                self.drag_start = None
                 return True
 
         return super().eventFilter(obj, event)
         
+    @tracer.traced("transform", turn=True)
     def transform_to(self, mode):
         if mode in self.transform_sets:
             self.current_mode = mode
             gif_path = self.transform_sets[mode]
             if os.path.exists(gif_path):
-                self.movie.stop()
-                self.movie = QMovie(gif_path)
-                self.avatar_label.setMovie(self.movie)
-                self.movie.start()
+                self.set_avatar_movie(gif_path)
 
                 # Play transform sound
-                pygame.mixer.Sound(resource_path("assets/sfx/transform.mp3")).play()
+                play_sound(resource_path("assets/sfx/transform.mp3"))
 
                 # Apply transform VFX
                 self.apply_vfx(mode)
@@ -700,6 +945,7 @@ class GenosChat(QMainWindow):
                 # Schedule revert
                 QTimer.singleShot(4000, self.end_transform_and_resume_expression)
 
+    @tracer.traced("transform_end", turn=True)
     def end_transform_and_resume_expression(self):
         self.current_mode = "base"
         self.update_emote(self.current_emotion)
@@ -709,158 +955,156 @@ class GenosChat(QMainWindow):
         # Revert avatar to idle
         idle_gif = GENOS_EMOTE_SETS["default"]["neutral"]
         if os.path.exists(idle_gif):
-            self.movie.stop()
-            self.movie = QMovie(idle_gif)
-            self.avatar_label.setMovie(self.movie)
-            self.movie.start()
+            self.set_avatar_movie(idle_gif)
             self.output_box.append("🔄 Genos has returned to IDLE mode.")
 
         # Reapply previous emotion overlays
         emotion = getattr(self, 'previous_emotion', 'neutral')
         self.apply_vfx(emotion)
         
-    def push_undo(self, state):
-        self.undo_stack.append(state.copy())
-        self.redo_stack.clear()
+    # -------- Undo/Redo --------
+
+    def layer_id(self, proxy):
+        # Layers are identified by the VFX state they belong to and their GIF name
+        return self.current_emotion, self.get_gif_name_by_proxy(proxy)
+
+    def layer_fields(self, proxy, fields):
+        widget = proxy.widget()
+        ge = widget.graphicsEffect() if widget else None
+        values = {
+            "x": proxy.pos().x(),
+            "y": proxy.pos().y(),
+            "w": widget.width() if widget else 0,
+            "h": widget.height() if widget else 0,
+            "rotation": proxy.rotation(),
+            "opacity": ge.opacity() if ge else 1.0,
+            "z": proxy.zValue()
+        }
+        return {field: values[field] for field in fields}
+
+    def set_layer_fields(self, proxy, fields):
+        widget = proxy.widget()
+        if "x" in fields or "y" in fields:
+            proxy.setPos(QPointF(fields.get("x", proxy.pos().x()), fields.get("y", proxy.pos().y())))
+        if widget and ("w" in fields or "h" in fields):
+            widget.resize(int(fields.get("w", widget.width())), int(fields.get("h", widget.height())))
+        if "rotation" in fields:
+            proxy.setRotation(fields["rotation"])
+        if widget and widget.graphicsEffect() and "opacity" in fields:
+            widget.graphicsEffect().setOpacity(fields["opacity"])
+        if "z" in fields:
+            proxy.setZValue(fields["z"])
+
+    def edit_layer(self, proxy, apply, fields, merge=True):
+        # Record only the touched fields; repeated edits of the same fields merge
+        before = self.layer_fields(proxy, fields)
+        apply(proxy)
+        self.history.record(self.layer_id(proxy), before, self.layer_fields(proxy, fields), merge)
+        self.save_vfx_state(proxy, self.get_gif_name_by_proxy(proxy))
+
+    def edit_active_layer(self, apply, fields, merge=True):
+        if self.active_proxy:
+            self.edit_layer(self.active_proxy, apply, fields, merge)
 
     def undo(self):
-        if self.undo_stack:
-            state = self.undo_stack.pop()
-            self.redo_stack.append(self.capture_state())
-            self.restore_state(state)
+        self.apply_history_step(self.history.undo())
 
     def redo(self):
-        if self.redo_stack:
-            state = self.redo_stack.pop()
-            self.undo_stack.append(self.capture_state())
-            self.restore_state(state)
-    
+        self.apply_history_step(self.history.redo())
+
+    def apply_history_step(self, step):
+        if step is None:
+            return
+        (state, gif_name), fields = step
+        if state != self.current_emotion:
+            # Bring the edited layer set back on screen before changing it
+            self.apply_vfx(state)
+        proxy = next((p for p, g in self.vfx_proxies if g == gif_name), None)
+        if proxy is None:
+            return
+        self.set_layer_fields(proxy, fields)
+        self.save_vfx_state(proxy, gif_name)
+        if proxy is self.active_proxy:
+            self.sync_controls(proxy)
+
+    # -------- Direct edits --------
+
     def update_x(self, value):
-        if self.active_proxy:
-            self.push_undo(self.capture_state())
-            self.active_proxy.setX(value)
-            self.save_active_proxy_state()
+        self.edit_active_layer(lambda p: p.setX(value), ("x",))
 
     def update_y(self, value):
-        if self.active_proxy:
-            self.push_undo(self.capture_state())
-            self.active_proxy.setY(value)
-            self.save_active_proxy_state()
+        self.edit_active_layer(lambda p: p.setY(value), ("y",))
 
     def update_w(self, value):
-        if self.active_proxy:
-            self.push_undo(self.capture_state())
-            self.active_proxy.widget().resize(value, self.active_proxy.widget().height())
-            self.save_active_proxy_state()
+        self.edit_active_layer(lambda p: p.widget().resize(value, p.widget().height()), ("w",))
 
     def update_h(self, value):
-        if self.active_proxy:
-            self.push_undo(self.capture_state())
-            self.active_proxy.widget().resize(self.active_proxy.widget().width(), value)
-            self.save_active_proxy_state()
+        self.edit_active_layer(lambda p: p.widget().resize(p.widget().width(), value), ("h",))
 
     def apply_rotation(self, value):
-        if self.active_proxy:
-            self.push_undo(self.capture_state())
-            self.active_proxy.setRotation(value)
-            self.save_active_proxy_state()
+        self.edit_active_layer(lambda p: p.setRotation(value), ("rotation",))
 
     def apply_opacity(self, value):
-        if self.active_proxy:
-            self.push_undo(self.capture_state())
-            opacity = value / 100.0
-            self.active_proxy.widget().graphicsEffect().setOpacity(opacity)
-            self.save_active_proxy_state()
+        self.edit_active_layer(lambda p: p.widget().graphicsEffect().setOpacity(value / 100.0), ("opacity",))
 
     def move_layer_up(self):
-        if self.active_proxy:
-            self.push_undo(self.capture_state())
-            z = self.active_proxy.zValue()
-            self.active_proxy.setZValue(z + 1)
+        self.edit_active_layer(lambda p: p.setZValue(p.zValue() + 1), ("z",))
 
     def move_layer_down(self):
-        if self.active_proxy:
-            self.push_undo(self.capture_state())
-            z = self.active_proxy.zValue()
-            self.active_proxy.setZValue(z - 1)
-
-    def push_undo(self, state):
-        self.undo_stack.append(state)
-        self.redo_stack.clear()
-
-    def undo(self):
-        if self.undo_stack:
-            prev = self.undo_stack.pop()
-            self.redo_stack.append(self.capture_state())
-            self.restore_state(prev)
-
-    def redo(self):
-        if self.redo_stack:
-            next = self.redo_stack.pop()
-            self.undo_stack.append(self.capture_state())
-            self.restore_state(next)
-
-    def capture_state(self):
-        state = []
-        for proxy, gif_name in self.vfx_proxies:
-            widget = proxy.widget()
-            if widget:
-                ge = widget.graphicsEffect()
-                opacity = ge.opacity() if ge else 1.0
-                state.append({
-                    "gif": gif_name,
-                    "pos": [proxy.pos().x(), proxy.pos().y()],
-                    "size": [widget.width(), widget.height()],
-                    "rotation": proxy.rotation(),
-                    "opacity": opacity
-                })
-            else:
-                print(f"[WARN] capture_state: Skipping proxy for {gif_name} — widget is None.")
-        return state
-
-    def restore_state(self, state):
-        for item in state:
-            for proxy, gif_name in self.vfx_proxies:
-                if gif_name == item["gif"]:
-                    proxy.setPos(QPointF(item["pos"][0], item["pos"][1]))
-                    proxy.widget().resize(item["size"][0], item["size"][1])
-                    proxy.setRotation(item["rotation"])
-                    proxy.widget().graphicsEffect().setOpacity(item["opacity"])
-                    self.save_vfx_state(proxy, gif_name)
-
-    def save_active_proxy_state(self):
-        if self.active_proxy:
-            for proxy, gif_name in self.vfx_proxies:
-                if proxy == self.active_proxy:
-                    self.save_vfx_state(proxy, gif_name)
+        self.edit_active_layer(lambda p: p.setZValue(p.zValue() - 1), ("z",))
 
     def save_vfx_state(self, proxy, gif_name):
-        screen_w, screen_h = self.width(), self.height()
         widget = proxy.widget()
         ge = widget.graphicsEffect() if widget else None
-        opacity = ge.opacity() if ge else 1.0
 
         cfg = self.effects_config["states"].setdefault(self.current_emotion, {}).setdefault(gif_name, {})
-        cfg["position_percent"] = [
-            proxy.pos().x() / screen_w,
-            proxy.pos().y() / screen_h
-        ]
-        cfg["size_percent"] = [
-            widget.width() / screen_w if widget else 0.1,
-            widget.height() / screen_h if widget else 0.1
-        ]
+        if widget:
+            cfg["position_percent"], cfg["size_percent"] = to_percent(
+                proxy.pos().x(), proxy.pos().y(), widget.width(), widget.height(), (self.width(), self.height())
+            )
         cfg["rotation"] = proxy.rotation()
-        cfg["opacity"] = opacity
+        if ge:
+            cfg["opacity"] = ge.opacity()
 
+        # Percent values are the source of truth; recompile this state's pixels lazily
+        self.vfx_layout.invalidate(self.current_emotion)
         self.save_effects_config()
 
 
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = GenosChat()
-    window.show()
+    parser = argparse.ArgumentParser(description="Genos desktop assistant")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help=f"time every startup phase, write {REPORT_PATH} and exit once ready")
+    parser.add_argument("--trace-hud", action="store_true", help="show the per-turn latency HUD (toggle with F3)")
+    parser.add_argument("--profile-render", action="store_true",
+                        help=f"measure frame times and per-layer paint cost, written to {RENDER_REPORT_PATH} on exit")
+    parser.add_argument("--snapshot", default=snapshot_path, help="local model snapshot folder")
+    parser.add_argument("--online", action="store_true",
+                        help="allow falling back to the Hugging Face hub if the snapshot is missing or invalid")
+    args, qt_args = parser.parse_known_args()
+
+    with startup.phase("create QApplication"):
+        app = QApplication(sys.argv[:1] + qt_args)
+    with startup.phase("build window"):
+        window = GenosChat(args.snapshot, args.online)
+        window.trace_hud.setVisible(args.trace_hud)
+        if args.profile_render:
+            window.enable_render_profiler()
+            app.aboutToQuit.connect(window.dump_render_profile)
+        window.show()
+
+    def finish_startup(ok):
+        startup.print_summary(detailed=args.profile_startup)
+        if args.profile_startup:
+            startup.write_report()
+            print(f"📝 Wrote {REPORT_PATH}")
+            app.quit()
+
+    window.boot_finished.connect(finish_startup)
+    # Let the first frame paint before the heavy subsystems start
+    QTimer.singleShot(0, window.boot)
     sys.exit(app.exec())
 
 
@@ -0,0 +1,131 @@
+# Periodic memory telemetry for long-running kiosk sessions
+#
+# Every SAMPLE_INTERVAL_MS: process RSS (psutil), CUDA allocated/reserved memory when torch
+# is already loaded, and whatever per-subsystem counters were registered (live movies,
+# cached sounds, transcript size, undo depth...). Samples go to a rolling JSONL log; the
+# RSS trend over the last samples is reported as MB/hour so slow leaks stand out.
+
+import os
+import sys
+import time
+from collections import deque
+import psutil
+from PySide6.QtCore import QObject, QTimer, Qt
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QLabel
+from turn_tracer import append_rolling
+
+LOG_PATH = "memory_telemetry.jsonl"
+SAMPLE_INTERVAL_MS = 30000
+TREND_SAMPLES = 120          # one hour at the default interval
+LEAK_WARN_MB_PER_H = 50
+MIN_TREND_S = 600            # shorter windows are dominated by warm-up noise
+
+
+class MemoryTelemetry(QObject):
+    def __init__(self, parent=None, interval=SAMPLE_INTERVAL_MS, log_path=LOG_PATH):
+        super().__init__(parent)
+        self.process = psutil.Process(os.getpid())
+        self.log_path = log_path
+        self.counters = {}            # name -> zero-argument callable
+        self.history = deque(maxlen=TREND_SAMPLES)
+        self.last_sample = None
+        self.listeners = []
+        self.warned = False
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.sample)
+        self.timer.start(interval)
+
+    def add_counter(self, name, reader):
+        self.counters[name] = reader
+
+    def cuda_memory(self):
+        # Never import torch just to ask; it is only loaded once the model is
+        torch = sys.modules.get("torch")
+        if torch is None or not torch.cuda.is_available():
+            return None
+        return {
+            "allocated_mb": round(torch.cuda.memory_allocated() / 2**20, 1),
+            "reserved_mb": round(torch.cuda.memory_reserved() / 2**20, 1),
+            "peak_mb": round(torch.cuda.max_memory_allocated() / 2**20, 1)
+        }
+
+    def rss_trend(self):
+        # MB per hour between the oldest and newest sample in the window
+        if len(self.history) < 2:
+            return None
+        (t0, rss0), (t1, rss1) = self.history[0], self.history[-1]
+        if t1 - t0 < MIN_TREND_S:
+            return None
+        return round((rss1 - rss0) / ((t1 - t0) / 3600), 1)
+
+    def sample(self):
+        now = time.time()
+        rss_mb = round(self.process.memory_info().rss / 2**20, 1)
+        self.history.append((now, rss_mb))
+        record = {"time": now, "rss_mb": rss_mb, "rss_trend_mb_per_h": self.rss_trend()}
+
+        cuda = self.cuda_memory()
+        if cuda:
+            record["cuda"] = cuda
+
+        counters = {}
+        for name, reader in self.counters.items():
+            try:
+                counters[name] = reader()
+            except Exception as e:
+                counters[name] = f"error: {e}"
+        record["counters"] = counters
+
+        trend = record["rss_trend_mb_per_h"]
+        if trend is not None and trend > LEAK_WARN_MB_PER_H and len(self.history) == self.history.maxlen:
+            if not self.warned:
+                print(f"[WARN] MemoryTelemetry: RSS growing {trend} MB/h over the last hour")
+                self.warned = True
+        else:
+            self.warned = False
+
+        try:
+            append_rolling(self.log_path, record)
+        except OSError as e:
+            print(f"[WARN] MemoryTelemetry: could not write {self.log_path}: {e}")
+        self.last_sample = record
+        for listener in self.listeners:
+            listener(record)
+        return record
+
+
+class MemoryPanel(QLabel):
+    # Debug overlay with the latest telemetry sample
+    def __init__(self, telemetry, parent):
+        super().__init__(parent)
+        self.telemetry = telemetry
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: #00E5FF; padding: 6px;")
+        self.setFont(QFont("monospace", 8))
+        telemetry.listeners.append(self.on_sample)
+
+    def on_sample(self, record):
+        if self.isVisible():
+            self.refresh()
+
+    def refresh(self):
+        record = self.telemetry.last_sample or self.telemetry.sample()
+        trend = record["rss_trend_mb_per_h"]
+        lines = [f"RSS {record['rss_mb']:.0f} MB" + (f"  ({trend:+.1f} MB/h)" if trend is not None else "")]
+        if "cuda" in record:
+            cuda = record["cuda"]
+            lines.append(f"CUDA {cuda['allocated_mb']:.0f} / {cuda['reserved_mb']:.0f} MB (peak {cuda['peak_mb']:.0f})")
+        for name, value in record["counters"].items():
+            lines.append(f"  {name:<20}{value}")
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        # Bottom-left of the view, clear of the latency HUD
+        self.move(8, max(8, self.parentWidget().height() - self.height() - 8))
+        self.raise_()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+        if self.isVisible():
+            self.refresh()
@@ -0,0 +1,155 @@
+# Pinned local model snapshot: base model + tokenizer + Genos LoRA adapter in one folder,
+# described by a manifest of file hashes. Startup loads from it with the hub switched off;
+# the network is only used when explicitly asked for (staging, or --online fallback).
+#
+#   model_snapshot/
+#       base/        snapshot_download of the base model repo (weights + tokenizer)
+#       adapter/     copy of genos_lora_adapter
+#       manifest.json
+#
+# Stage one on a connected machine and copy the folder to the kiosks:
+#   python model_snapshot.py stage --token-file token.txt
+#   python model_snapshot.py verify --full
+
+import os
+import json
+import time
+import shutil
+import argparse
+from batch_runner import atomic_output, file_sha256
+
+SNAPSHOT_DIR = "model_snapshot"
+MANIFEST_NAME = "manifest.json"
+BASE_MODEL = "google/gemma-2b-it"
+ADAPTER_DIR = "genos_lora_adapter"
+
+class SnapshotError(Exception):
+    pass
+
+def snapshot_paths(snapshot_dir):
+    return {
+        "base": os.path.join(snapshot_dir, "base"),
+        "tokenizer": os.path.join(snapshot_dir, "base"),
+        "adapter": os.path.join(snapshot_dir, "adapter"),
+        "manifest": os.path.join(snapshot_dir, MANIFEST_NAME)
+    }
+
+def list_files(snapshot_dir):
+    files = []
+    for root, dirs, names in os.walk(snapshot_dir):
+        # snapshot_download keeps its own bookkeeping in .cache/; it is not model content
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, snapshot_dir).replace(os.sep, "/")
+            if rel != MANIFEST_NAME and not name.startswith("."):
+                files.append(rel)
+    return sorted(files)
+
+def read_manifest(snapshot_dir):
+    try:
+        with open(snapshot_paths(snapshot_dir)["manifest"], "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(snapshot_dir, base_model):
+    files = {}
+    for rel in list_files(snapshot_dir):
+        path = os.path.join(snapshot_dir, rel)
+        files[rel] = {"sha256": file_sha256(path), "bytes": os.path.getsize(path)}
+    manifest = {
+        "base_model": base_model,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": files
+    }
+    with atomic_output(snapshot_paths(snapshot_dir)["manifest"]) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f, indent=4)
+    return manifest
+
+def verify_snapshot(snapshot_dir, full=False):
+    # Quick check (default) compares presence and size; full=True re-hashes every file
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        raise SnapshotError(f"no {MANIFEST_NAME} in {snapshot_dir}")
+    problems = []
+    for rel, entry in manifest["files"].items():
+        path = os.path.join(snapshot_dir, rel)
+        if not os.path.isfile(path):
+            problems.append(f"missing {rel}")
+        elif os.path.getsize(path) != entry["bytes"]:
+            problems.append(f"size mismatch {rel}")
+        elif full and file_sha256(path) != entry["sha256"]:
+            problems.append(f"hash mismatch {rel}")
+    if problems:
+        shown = ", ".join(problems[:5]) + (f" (+{len(problems) - 5} more)" if len(problems) > 5 else "")
+        raise SnapshotError(f"snapshot {snapshot_dir} failed verification: {shown}")
+    return manifest
+
+def resolve_model(snapshot_dir=SNAPSHOT_DIR, base_model=BASE_MODEL, adapter_dir=ADAPTER_DIR,
+                  allow_network=False, token_file=None, full_verify=False):
+    # Returns where to load from: {"base", "tokenizer", "adapter", "token", "offline"}
+    try:
+        manifest = verify_snapshot(snapshot_dir, full_verify)
+        if manifest.get("base_model") != base_model:
+            raise SnapshotError(f"snapshot holds {manifest.get('base_model')}, expected {base_model}")
+        paths = snapshot_paths(snapshot_dir)
+        # Make sure nothing downstream tries the hub (read when huggingface_hub is imported)
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+        return {"base": paths["base"], "tokenizer": paths["tokenizer"], "adapter": paths["adapter"],
+                "token": None, "offline": True}
+    except SnapshotError as e:
+        if not allow_network:
+            raise SnapshotError(f"{e}; stage one with `python model_snapshot.py stage` or pass --online") from e
+        print(f"[WARN] {e}; falling back to the Hugging Face hub")
+
+    token = None
+    if token_file and os.path.exists(token_file):
+        with open(token_file, "r") as f:
+            token = f.read().strip()
+    return {"base": base_model, "tokenizer": base_model, "adapter": adapter_dir, "token": token, "offline": False}
+
+def stage_snapshot(snapshot_dir=SNAPSHOT_DIR, base_model=BASE_MODEL, adapter_dir=ADAPTER_DIR, token=None):
+    from huggingface_hub import snapshot_download
+
+    paths = snapshot_paths(snapshot_dir)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    print(f"⬇️ Downloading {base_model} to {paths['base']}")
+    snapshot_download(repo_id=base_model, local_dir=paths["base"], token=token)
+
+    if not os.path.isdir(adapter_dir):
+        raise SnapshotError(f"adapter folder {adapter_dir} not found")
+    shutil.rmtree(paths["adapter"], ignore_errors=True)
+    shutil.copytree(adapter_dir, paths["adapter"])
+
+    manifest = write_manifest(snapshot_dir, base_model)
+    total = sum(entry["bytes"] for entry in manifest["files"].values())
+    print(f"✅ Staged {len(manifest['files'])} files ({total / 2**30:.2f} GiB) in {snapshot_dir}")
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage or verify the offline model snapshot")
+    parser.add_argument("command", choices=["stage", "verify"])
+    parser.add_argument("--snapshot", default=SNAPSHOT_DIR, help="snapshot folder")
+    parser.add_argument("--model", default=BASE_MODEL, help="base model repo id")
+    parser.add_argument("--adapter", default=ADAPTER_DIR, help="LoRA adapter folder to include")
+    parser.add_argument("--token-file", default=None, help="file holding a Hugging Face token (stage only)")
+    parser.add_argument("--full", action="store_true", help="verify: re-hash every file instead of checking sizes")
+    args = parser.parse_args()
+
+    if args.command == "stage":
+        token = None
+        if args.token_file:
+            with open(args.token_file, "r") as f:
+                token = f.read().strip()
+        stage_snapshot(args.snapshot, args.model, args.adapter, token)
+    else:
+        try:
+            manifest = verify_snapshot(args.snapshot, args.full)
+        except SnapshotError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ {args.snapshot}: {len(manifest['files'])} files match the manifest"
+              + (" (full hash check)" if args.full else " (size check)"))
@@ -2,11 +2,15 @@ import os
 import subprocess
 from PIL import Image
 import numpy as np
+from gif_blocks import GifStreamWriter
+from batch_runner import atomic_output, file_sha256, is_up_to_date, write_sidecar, run_batch
+
+TOOL = "mp4_to_gif"
 
 def extract_frames_with_ffmpeg(mp4_path, output_folder, fps=10):
     os.makedirs(output_folder, exist_ok=True)
     cmd = [
-        "ffmpeg", "-i", mp4_path,
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", mp4_path,
         "-vf", f"fps={fps}",
         os.path.join(output_folder, "frame_%04d.png")
     ]
@@ -40,21 +44,82 @@ def make_gif_with_transparency(frames_folder, output_gif):
         )
         print(f"✅ Created GIF: {output_gif}")
 
-def process_all_mp4s_in_folder(folder="."):
-    for file in os.listdir(folder):
+def probe_video_size(mp4_path):
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height", "-of", "csv=p=0:s=x", mp4_path
+    ]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    width, height = out.strip().splitlines()[0].split("x")[:2]
+    return int(width), int(height)
+
+def read_exact(stream, view):
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+def stream_mp4_to_gif(mp4_path, output_gif, fps=10):
+    # ffmpeg decodes straight to RGBA on stdout; no PNGs are written or re-read
+    width, height = probe_video_size(mp4_path)
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", mp4_path,
+        "-vf", f"fps={fps}", "-f", "rawvideo", "-pix_fmt", "rgba", "-"
+    ]
+
+    # One reusable frame buffer and mask, so memory stays flat however long the clip is
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    view = memoryview(frame).cast("B")
+    white_mask = np.empty((height, width), dtype=bool)
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    try:
+        with GifStreamWriter(output_gif, (width, height), 1000 / fps) as writer:
+            while read_exact(proc.stdout, view) == len(view):
+                # Make white (or near-white) transparent
+                np.all(frame[..., :3] > 240, axis=2, out=white_mask)
+                frame[..., 3][white_mask] = 0
+                writer.add_frame(Image.fromarray(frame, mode="RGBA"))
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    if not writer.frame_count:
+        raise RuntimeError("ffmpeg produced no frames")
+    return writer.frame_count
+
+def convert_mp4_if_changed(mp4_path, gif_path, fps=10):
+    params = {"fps": fps}
+    source_hash = file_sha256(mp4_path)
+    if is_up_to_date(gif_path, source_hash, params, TOOL):
+        return "unchanged, skipped"
+
+    with atomic_output(gif_path) as temp_gif:
+        frame_count = stream_mp4_to_gif(mp4_path, temp_gif, fps)
+
+    # A fresh conversion: whatever clean/optimize did to the old GIF no longer applies
+    write_sidecar(gif_path, source_hash, params, TOOL)
+    return f"created {os.path.basename(gif_path)} ({frame_count} frames)"
+
+def process_all_mp4s_in_folder(folder=".", fps=10, workers=None):
+    jobs = []
+    for file in sorted(os.listdir(folder)):
         if file.lower().endswith(".mp4"):
             mp4_path = os.path.join(folder, file)
-            temp_dir = os.path.join(folder, "temp_frames")
             gif_name = os.path.splitext(file)[0] + ".gif"
             gif_path = os.path.join(folder, gif_name)
+            jobs.append((mp4_path, gif_path, fps))
 
-            extract_frames_with_ffmpeg(mp4_path, temp_dir)
-            make_gif_with_transparency(temp_dir, gif_path)
-
-            # Clean up
-            for f in os.listdir(temp_dir):
-                os.remove(os.path.join(temp_dir, f))
-            os.rmdir(temp_dir)
+    print(f"🎞️ Processing {len(jobs)} MP4(s) in {folder}")
+    return run_batch(convert_mp4_if_changed, jobs, workers)
 
 if __name__ == "__main__":
     process_all_mp4s_in_folder()
@@ -0,0 +1,181 @@
+import os
+import time
+from PIL import Image, ImageSequence
+import numpy as np
+from gif_blocks import GifStreamWriter, encode_single_frame
+from batch_runner import atomic_output, file_sha256, is_up_to_date, write_sidecar, run_batch
+
+TRANSPARENT = 255          # palette slot reserved for transparency
+MAX_PALETTE_SAMPLES = 1 << 20
+TOOL = "optimize"
+
+class KeepOriginal(Exception):
+    pass
+
+# --------------------------
+# Frame analysis
+# --------------------------
+
+def load_frames(path):
+    frames, durations = [], []
+    with Image.open(path) as gif:
+        for frame in ImageSequence.Iterator(gif):
+            durations.append(frame.info.get("duration", 100) or 100)
+            frames.append(np.array(frame.convert("RGBA")))
+    return frames, durations
+
+def build_shared_palette(frames):
+    # One palette for the whole animation, sampled from the opaque pixels of every frame
+    pixels = np.concatenate([f[..., :3][f[..., 3] >= 128] for f in frames])
+    if len(pixels) == 0:
+        pixels = np.zeros((1, 3), dtype=np.uint8)
+    step = max(1, len(pixels) // MAX_PALETTE_SAMPLES)
+    sample = Image.fromarray(np.ascontiguousarray(pixels[::step])[None, :, :], "RGB")
+    colors = sample.quantize(colors=TRANSPARENT, method=Image.Quantize.MEDIANCUT).getpalette()
+    colors = colors[:TRANSPARENT * 3]
+    count = len(colors) // 3
+
+    # Pad with copies of the first colour so stray matches land on a real entry
+    palette = colors + colors[:3] * (256 - count)
+    palette_image = Image.new("P", (1, 1))
+    palette_image.putpalette(palette)
+    return bytes(palette), palette_image, count
+
+def map_to_palette(frame, palette_image, count):
+    rgb = Image.fromarray(np.ascontiguousarray(frame[..., :3]), "RGB")
+    indices = np.array(rgb.quantize(palette=palette_image, dither=Image.Dither.NONE))
+    indices[indices >= count] = 0
+    indices[frame[..., 3] < 128] = TRANSPARENT
+    return indices
+
+def dedup_frames(indices, durations):
+    # Consecutive identical frames collapse into one with their delays added up
+    kept, kept_durations = [indices[0]], [durations[0]]
+    for frame, duration in zip(indices[1:], durations[1:]):
+        if np.array_equal(frame, kept[-1]):
+            kept_durations[-1] += duration
+        else:
+            kept.append(frame)
+            kept_durations.append(duration)
+    return kept, kept_durations
+
+def bounding_box(mask):
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0:
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+def union_box(a, b):
+    if a is None or b is None:
+        return a or b
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+def plan_delta_frames(indices):
+    # Each frame is drawn over the previous one (disposal 1) and cropped to what changed.
+    # A frame is cleared instead (disposal 2) when the next one needs pixels to turn
+    # transparent, which a "keep previous" frame cannot express; the wrap-around check
+    # keeps the first frame correct when the animation loops.
+    count = len(indices)
+    opaque = [frame != TRANSPARENT for frame in indices]
+    clears = [
+        count > 1 and bool((opaque[i] & ~opaque[(i + 1) % count]).any())
+        for i in range(count)
+    ]
+
+    canvas = np.full(indices[0].shape, TRANSPARENT, dtype=np.uint8)
+    plans = []
+    for i, target in enumerate(indices):
+        changed = target != canvas
+        box = bounding_box(changed)
+        if clears[i]:
+            # Cover every opaque pixel so disposing this frame leaves an empty canvas
+            box = union_box(box, bounding_box(opaque[i]))
+        x0, y0, x1, y1 = box or (0, 0, 1, 1)
+
+        region = target[y0:y1, x0:x1].copy()
+        region[~changed[y0:y1, x0:x1]] = TRANSPARENT   # unchanged pixels show through
+        plans.append((region, (x0, y0, x1 - x0, y1 - y0), 2 if clears[i] else 1))
+
+        if clears[i]:
+            canvas[:] = TRANSPARENT
+        else:
+            canvas = target.copy()
+    return plans
+
+# --------------------------
+# Optimize + report
+# --------------------------
+
+def measure_decode_ms(path):
+    start = time.perf_counter()
+    with Image.open(path) as gif:
+        for frame in ImageSequence.Iterator(gif):
+            frame.convert("RGBA")
+    return (time.perf_counter() - start) * 1000
+
+def write_optimized_gif(frames, durations, output_path):
+    palette, palette_image, count = build_shared_palette(frames)
+    indices = [map_to_palette(frame, palette_image, count) for frame in frames]
+    indices, durations = dedup_frames(indices, durations)
+    height, width = indices[0].shape
+
+    with GifStreamWriter(output_path, (width, height), palette=palette, background=TRANSPARENT) as writer:
+        for (region, box, disposal), duration in zip(plan_delta_frames(indices), durations):
+            image = Image.fromarray(region, "P")
+            image.putpalette(palette)
+            frame_palette, data, transparency = encode_single_frame(image, optimize=False, transparency=TRANSPARENT)
+            writer.write_frame(frame_palette, data, transparency, box, duration, disposal)
+    return len(indices)
+
+def optimize_gif(input_path, output_path=None):
+    output_path = output_path or input_path
+    frames, durations = load_frames(input_path)
+    report = {
+        "frames_before": len(frames),
+        "bytes_before": os.path.getsize(input_path),
+        "decode_ms_before": measure_decode_ms(input_path)
+    }
+
+    try:
+        with atomic_output(output_path) as temp_path:
+            report["frames_after"] = write_optimized_gif(frames, durations, temp_path)
+            report["bytes_after"] = os.path.getsize(temp_path)
+            report["decode_ms_after"] = measure_decode_ms(temp_path)
+
+            # Never replace an asset with something bigger
+            if output_path == input_path and report["bytes_after"] >= report["bytes_before"]:
+                raise KeepOriginal()
+    except KeepOriginal:
+        report["kept_original"] = True
+    return report
+
+def format_report(name, report):
+    saved = 100 * (1 - report["bytes_after"] / report["bytes_before"])
+    return (
+        f"{name}: {report['bytes_before']} -> {report['bytes_after']} bytes ({saved:.1f}% saved), "
+        f"{report['frames_before']} -> {report['frames_after']} frames, "
+        f"decode {report['decode_ms_before']:.1f} -> {report['decode_ms_after']:.1f} ms"
+        + (" [kept original]" if report.get("kept_original") else "")
+    )
+
+def optimize_gif_if_changed(input_path):
+    params = {"optimizer": 1}
+    before = file_sha256(input_path)
+    if is_up_to_date(input_path, None, params, TOOL, before):
+        return "unchanged, skipped"
+    report = optimize_gif(input_path)
+    write_sidecar(input_path, None, params, TOOL, before)
+    return format_report(os.path.basename(input_path), report)
+
+def optimize_all_gifs_in_directory(directory=".", workers=None):
+    jobs = [
+        (os.path.join(directory, filename),)
+        for filename in sorted(os.listdir(directory))
+        if filename.lower().endswith(".gif") and not filename.startswith(".")
+    ]
+    print(f"🗜️ Optimizing {len(jobs)} GIF(s) in {directory}")
+    return run_batch(optimize_gif_if_changed, jobs, workers)
+
+if __name__ == "__main__":
+    optimize_all_gifs_in_directory()
@@ -0,0 +1,92 @@
+# Cached battery monitor and power policy
+#
+# The battery sensor is read on a background thread every SAMPLE_INTERVAL_MS; hot paths
+# (update_emote, the animation scheduler) only read the cached value. Crossing the low
+# battery threshold switches the power profile, which the window applies: shorter
+# replies, weak emotes, no VFX layers, slower animations and paused ambient music.
+
+from concurrent.futures import ThreadPoolExecutor
+import psutil
+from PySide6.QtCore import QObject, QTimer, QCoreApplication, Signal
+from animation_scheduler import LOW_BATTERY_THRESHOLD
+
+SAMPLE_INTERVAL_MS = 30000
+
+POWER_PROFILES = {
+    "normal": {
+        "max_new_tokens": 100,
+        "weak_emotes": False,
+        "max_vfx_layers": None,       # no cap
+        "ambient_music": True
+    },
+    "low": {
+        "max_new_tokens": 48,
+        "weak_emotes": True,
+        "max_vfx_layers": 0,
+        "ambient_music": False
+    }
+}
+
+def read_battery():
+    # Desktops without a battery count as full
+    battery = psutil.sensors_battery()
+    return battery.percent if battery else 100
+
+
+class PowerMonitor(QObject):
+    profile_changed = Signal(str)     # new profile name
+    _sampled = Signal(object)
+
+    def __init__(self, parent=None, reader=read_battery, interval=SAMPLE_INTERVAL_MS,
+                 low_battery_threshold=LOW_BATTERY_THRESHOLD):
+        super().__init__(parent)
+        self.reader = reader
+        self.low_battery_threshold = low_battery_threshold
+        self.battery = 100
+        self.profile_name = "normal"
+        self.pending = None
+
+        self.sampler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="battery-sampler")
+        self._sampled.connect(self._apply_sample)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.sample)
+        self.timer.start(interval)
+        self.sample()
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    @property
+    def profile(self):
+        return POWER_PROFILES[self.profile_name]
+
+    def percent(self):
+        # Cached; safe to call from any hot path
+        return self.battery
+
+    def sample(self):
+        # Skip a tick rather than queue up reads behind a slow sensor
+        if self.sampler is None or (self.pending is not None and not self.pending.done()):
+            return
+        self.pending = self.sampler.submit(self._read)
+
+    def _read(self):
+        try:
+            self._sampled.emit(self.reader())
+        except Exception as e:
+            print(f"[WARN] PowerMonitor: battery read failed: {e}")
+
+    def _apply_sample(self, battery):
+        self.battery = battery
+        name = "low" if self.battery < self.low_battery_threshold else "normal"
+        if name != self.profile_name:
+            self.profile_name = name
+            self.profile_changed.emit(name)
+
+    def close(self):
+        self.timer.stop()
+        if self.sampler is not None:
+            self.sampler.shutdown(wait=True)
+            self.sampler = None
@@ -0,0 +1,120 @@
+# Opt-in scene render profiler for the chat window's QGraphicsView
+#
+# A frame is one scene render of the view: drawBackground() starts it, drawForeground()
+# ends it. Tracked items (avatar, each VFX layer) get their paint() wrapped to attribute
+# paint time per item. Everything is grouped by the VFX state on screen, so the report
+# shows which effects_config states are too heavy for a machine.
+
+import json
+import time
+from collections import defaultdict, deque
+from turn_tracer import percentile
+
+REPORT_PATH = "render_profile.json"
+FRAME_BUDGET_MS = 1000 / 60  # a frame slower than this misses a 60 Hz refresh
+SAMPLES = 2000               # per state / per item, for percentiles
+
+
+def new_state_stats():
+    return {
+        "frames": 0,
+        "late": 0,
+        "first": None,
+        "last": None,
+        "frame_ms": deque(maxlen=SAMPLES),
+        "interval_ms": deque(maxlen=SAMPLES),
+        "items": defaultdict(lambda: deque(maxlen=SAMPLES))
+    }
+
+
+class RenderProfiler:
+    def __init__(self, view, state_reader, budget_ms=FRAME_BUDGET_MS, report_path=REPORT_PATH):
+        self.view = view
+        self.state_reader = state_reader
+        self.budget_ms = budget_ms
+        self.report_path = report_path
+        self.states = defaultdict(new_state_stats)
+        self.frame_start = None
+        self.frame_items = defaultdict(float)
+
+        # Instance attributes override the C++ virtuals for this one view
+        base = type(view)
+        view.drawBackground = lambda painter, rect: self._begin_frame(base.drawBackground, painter, rect)
+        view.drawForeground = lambda painter, rect: self._end_frame(base.drawForeground, painter, rect)
+
+    def now_ms(self):
+        return time.perf_counter() * 1000
+
+    def track(self, item, name):
+        base_paint = type(item).paint
+
+        def paint(painter, option, widget=None):
+            start = self.now_ms()
+            base_paint(item, painter, option, widget)
+            self.frame_items[name] += self.now_ms() - start
+
+        item.paint = paint
+        return item
+
+    def _begin_frame(self, draw, painter, rect):
+        self.frame_start = self.now_ms()
+        self.frame_items.clear()
+        draw(self.view, painter, rect)
+
+    def _end_frame(self, draw, painter, rect):
+        draw(self.view, painter, rect)
+        if self.frame_start is None:
+            return
+        end = self.now_ms()
+        stats = self.states[self.state_reader()]
+        frame_ms = end - self.frame_start
+        stats["frames"] += 1
+        stats["frame_ms"].append(frame_ms)
+        if frame_ms > self.budget_ms:
+            stats["late"] += 1
+        if stats["last"] is not None:
+            stats["interval_ms"].append(self.frame_start - stats["last"])
+        if stats["first"] is None:
+            stats["first"] = self.frame_start
+        stats["last"] = self.frame_start
+        for name, cost in self.frame_items.items():
+            stats["items"][name].append(cost)
+        self.frame_start = None
+
+    def report(self):
+        report = {"budget_ms": round(self.budget_ms, 2), "states": {}}
+        for state, stats in self.states.items():
+            if not stats["frames"]:
+                continue
+            elapsed = (stats["last"] - stats["first"]) / 1000
+            frames = stats["frame_ms"]
+            report["states"][state] = {
+                "frames": stats["frames"],
+                "fps": round((stats["frames"] - 1) / elapsed, 1) if elapsed > 0 else None,
+                "late_frames": stats["late"],
+                "frame_ms_p50": round(percentile(frames, 50), 3),
+                "frame_ms_p95": round(percentile(frames, 95), 3),
+                "interval_ms_p95": round(percentile(stats["interval_ms"], 95), 2) if stats["interval_ms"] else None,
+                "items": {
+                    name: {
+                        "paint_ms_mean": round(sum(costs) / len(costs), 3),
+                        "paint_ms_p95": round(percentile(costs, 95), 3),
+                        "painted_frames": len(costs)
+                    }
+                    for name, costs in sorted(stats["items"].items(), key=lambda kv: -sum(kv[1]))
+                }
+            }
+        return report
+
+    def write_report(self, path=None):
+        report = self.report()
+        with open(path or self.report_path, "w") as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def print_summary(self):
+        for state, stats in self.report()["states"].items():
+            heaviest = next(iter(stats["items"].items()), None)
+            top = f", heaviest {heaviest[0]} {heaviest[1]['paint_ms_mean']:.2f} ms" if heaviest else ""
+            print(f"🎞️ {state}: {stats['frames']} frames, {stats['fps']} fps, "
+                  f"p95 {stats['frame_ms_p95']:.2f} ms, {stats['late_frames']} late{top}")
@@ -0,0 +1,95 @@
+# Startup phase profiler: wall time of every import and init step from process start
+# to "window shown" and "ready to chat", checked against the kiosk cold-start targets.
+
+import os
+import sys
+import json
+import time
+import threading
+import importlib
+from contextlib import contextmanager
+
+REPORT_PATH = "startup_profile.json"
+
+# Cold-start budget on the kiosks (seconds since process start)
+TARGETS = {
+    "window_shown": 2.0,
+    "ready": 30.0
+}
+
+def process_start_time():
+    # perf_counter() value at interpreter start, so imports before main() are included
+    try:
+        import psutil
+        started = psutil.Process(os.getpid()).create_time()
+        return time.perf_counter() - (time.time() - started)
+    except Exception:
+        return time.perf_counter()
+
+
+class StartupProfiler:
+    def __init__(self, report_path=REPORT_PATH, targets=TARGETS):
+        self.origin = process_start_time()
+        self.report_path = report_path
+        self.targets = targets
+        self.phases = []              # {"name", "start_s", "duration_s", "thread"}
+        self.marks = {}               # milestone name -> seconds since process start
+        self.lock = threading.Lock()
+
+    def now(self):
+        return time.perf_counter() - self.origin
+
+    @contextmanager
+    def phase(self, name):
+        start = self.now()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases.append({
+                    "name": name,
+                    "start_s": round(start, 4),
+                    "duration_s": round(self.now() - start, 4),
+                    "thread": threading.current_thread().name
+                })
+
+    def import_module(self, name):
+        # Timed import; an already-imported module costs ~0 and is reported as such
+        cached = name in sys.modules
+        with self.phase(f"import {name}" + (" (cached)" if cached else "")):
+            return importlib.import_module(name)
+
+    def mark(self, name):
+        with self.lock:
+            self.marks[name] = round(self.now(), 4)
+
+    def report(self):
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p["start_s"])
+            marks = dict(self.marks)
+        return {
+            "phases": phases,
+            "marks": marks,
+            "targets": {
+                name: {"target_s": target, "actual_s": marks.get(name),
+                       "ok": marks.get(name) is not None and marks[name] <= target}
+                for name, target in self.targets.items()
+            }
+        }
+
+    def write_report(self, path=None):
+        report = self.report()
+        with open(path or self.report_path, "w") as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def print_summary(self, detailed=False):
+        report = self.report()
+        if detailed:
+            for p in sorted(report["phases"], key=lambda p: -p["duration_s"]):
+                print(f"   {p['duration_s']:8.3f}s  {p['name']}  [{p['thread']}]")
+        parts = []
+        for name, t in report["targets"].items():
+            if t["actual_s"] is not None:
+                parts.append(f"{name} {t['actual_s']:.2f}s ({'ok' if t['ok'] else 'over'} {t['target_s']:.0f}s target)")
+        print("⏱️ Startup: " + ", ".join(parts))
@@ -0,0 +1,140 @@
+# Throughput / step-time / memory instrumentation for Train_Genos_Lora.py
+#
+# Each optimizer step is appended to a JSONL file:
+#   tokens      non-pad tokens seen since the previous step (counted by CountingCollator)
+#   data_s      time between the end of one step and the start of the next (batch fetch + collate)
+#   compute_s   forward + backward of every micro-batch in the step
+#   optim_s     optimizer step (needs a transformers version with on_pre_optimizer_step)
+#   peak_mem_mb peak CUDA memory allocated during the step
+# Stage boundaries synchronize CUDA so kernel time lands in the right bucket.
+
+import os
+import json
+import time
+import torch
+from transformers import TrainerCallback
+
+METRICS_FILE = "train_metrics.jsonl"
+
+class CountingCollator:
+    # Wraps a data collator and counts the tokens that carry training signal
+    def __init__(self, collator):
+        self.collator = collator
+        self.tokens = 0
+
+    def __call__(self, features):
+        batch = self.collator(features)
+        if "attention_mask" in batch:
+            self.tokens += int(batch["attention_mask"].sum())
+        else:
+            # Packed batches have no padding at all
+            self.tokens += batch["input_ids"].numel()
+        return batch
+
+    def take(self):
+        tokens, self.tokens = self.tokens, 0
+        return tokens
+
+def parse_step_range(text):
+    # "20:25" -> (20, 25); steps are 1-based like state.global_step
+    if not text:
+        return None
+    start, end = (int(part) for part in text.split(":"))
+    if not 0 < start <= end:
+        raise ValueError(f"bad step range {text!r}, expected START:END with 0 < START <= END")
+    return start, end
+
+class ThroughputCallback(TrainerCallback):
+    def __init__(self, counter, output_dir, profile_steps=None):
+        self.counter = counter
+        self.path = os.path.join(output_dir, METRICS_FILE)
+        self.trace_dir = output_dir
+        self.profile_steps = profile_steps
+        self.profiler = None
+        self.cuda = torch.cuda.is_available()
+        self.file = None
+        self.marks = {}
+        self.totals = {"steps": 0, "tokens": 0, "time_s": 0.0, "peak_mem_mb": 0.0}
+
+    def sync(self):
+        if self.cuda:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.marks = {"end": self.sync()}
+        self.counter.take()
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        step = state.global_step + 1
+        if self.profile_steps and step == self.profile_steps[0]:
+            self.profiler = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU]
+                + ([torch.profiler.ProfilerActivity.CUDA] if self.cuda else []),
+                record_shapes=True,
+                profile_memory=True
+            )
+            self.profiler.__enter__()
+        if self.cuda:
+            torch.cuda.reset_peak_memory_stats()
+        self.marks["begin"] = self.sync()
+        self.marks.pop("pre_optim", None)
+        self.marks.pop("optim", None)
+
+    def on_pre_optimizer_step(self, args, state, control, **kwargs):
+        self.marks["pre_optim"] = self.sync()
+
+    def on_optimizer_step(self, args, state, control, **kwargs):
+        self.marks["optim"] = self.sync()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        end = self.sync()
+        begin = self.marks["begin"]
+        # Older transformers have no optimizer hooks: then compute_s includes the optimizer
+        compute_end = self.marks.get("pre_optim", end)
+        tokens = self.counter.take()
+        step_time = end - self.marks["end"]
+        record = {
+            "step": state.global_step,
+            "tokens": tokens,
+            "tokens_per_s": round(tokens / step_time, 1) if step_time > 0 else None,
+            "data_s": round(begin - self.marks["end"], 4),
+            "compute_s": round(compute_end - begin, 4),
+            "optim_s": round(self.marks.get("optim", end) - compute_end, 4),
+            "step_s": round(step_time, 4)
+        }
+        if self.cuda:
+            record["peak_mem_mb"] = round(torch.cuda.max_memory_allocated() / 2**20, 1)
+            self.totals["peak_mem_mb"] = max(self.totals["peak_mem_mb"], record["peak_mem_mb"])
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+        self.totals["steps"] += 1
+        self.totals["tokens"] += tokens
+        self.totals["time_s"] += step_time
+
+        if self.profiler and state.global_step >= self.profile_steps[1]:
+            self.stop_profiler(state.global_step)
+        # Measure the next data fetch from after all of this bookkeeping
+        self.marks["end"] = time.perf_counter()
+
+    def stop_profiler(self, step):
+        self.profiler.__exit__(None, None, None)
+        trace_path = os.path.join(self.trace_dir, f"trace_steps_{self.profile_steps[0]}-{step}.json")
+        self.profiler.export_chrome_trace(trace_path)
+        print(f"🔬 Saved profiler trace to {trace_path}")
+        self.profiler = None
+
+    def on_train_end(self, args, state, control, **kwargs):
+        if self.profiler:
+            self.stop_profiler(state.global_step)
+        if self.file:
+            self.file.close()
+            self.file = None
+        t = self.totals
+        if t["steps"]:
+            rate = t["tokens"] / t["time_s"] if t["time_s"] else 0
+            memory = f", peak {t['peak_mem_mb']:.0f} MB" if self.cuda else ""
+            print(f"📈 {t['steps']} steps, {t['tokens']} tokens, {rate:.0f} tokens/s{memory} -> {self.path}")
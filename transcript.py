@@ -0,0 +1,256 @@
+# Bounded chat transcript: every message goes to an append-only log on disk, but only a
+# window of at most MAX_ROWS messages is held in memory and laid out by the view.
+#
+#   transcript.log    one JSON line per message: {"t": unix time, "text": ...}
+#   transcript.idx    little-endian uint64 byte offset of each line in transcript.log
+#
+# Message i lives at the offset in idx slot i, so any page of history is one seek into
+# each file. Scrolling to the top of the view pages older messages back in from disk.
+
+import os
+import json
+import time
+import struct
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PySide6.QtGui import QGuiApplication, QKeySequence
+from PySide6.QtWidgets import QListView, QAbstractItemView, QStyledItemDelegate
+
+LOG_PATH = "transcript.log"
+MAX_ROWS = 500               # messages kept in memory / laid out by the view
+PAGE_SIZE = 100              # messages read back per scroll to the top or bottom
+OFFSET = struct.Struct("<Q")
+
+
+class TranscriptLog:
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self.index_path = os.path.splitext(path)[0] + ".idx"
+        self.count = self._recover()
+        self.log = open(self.path, "ab")
+        self.index = open(self.index_path, "ab")
+
+    def _recover(self):
+        # Bring the index in line with the log after a crash between (or during) writes
+        for path in (self.path, self.index_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+        log_size = os.path.getsize(self.path)
+        count = os.path.getsize(self.index_path) // OFFSET.size
+
+        with open(self.index_path, "r+b") as index:
+            last = None
+            if count:
+                index.seek((count - 1) * OFFSET.size)
+                last = OFFSET.unpack(index.read(OFFSET.size))[0]
+                if last >= log_size:
+                    count, last = 0, None             # index points past the log: rebuild
+            index.truncate(count * OFFSET.size)       # also drops a torn trailing entry
+
+            with open(self.path, "r+b") as log:
+                pos = last or 0
+                log.seek(pos)
+                for line in log:
+                    if not line.endswith(b"\n"):
+                        log.truncate(pos)             # torn last message
+                        if pos == last:
+                            count -= 1
+                            index.truncate(count * OFFSET.size)
+                        break
+                    if pos != last:
+                        index.seek(0, os.SEEK_END)
+                        index.write(OFFSET.pack(pos))
+                        count += 1
+                    pos += len(line)
+        return count
+
+    def append(self, text):
+        message = {"t": round(time.time(), 3), "text": text}
+        offset = self.log.tell()
+        self.log.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.log.flush()
+        # Index after the line is written: a crash in between is repaired by _recover()
+        self.index.write(OFFSET.pack(offset))
+        self.index.flush()
+        self.count += 1
+        return message
+
+    def read(self, start, stop):
+        # Messages [start, stop) as dicts
+        start, stop = max(0, start), min(stop, self.count)
+        if start >= stop:
+            return []
+        with open(self.index_path, "rb") as index:
+            index.seek(start * OFFSET.size)
+            begin = OFFSET.unpack(index.read(OFFSET.size))[0]
+            if stop < self.count:
+                index.seek(stop * OFFSET.size)
+                end = OFFSET.unpack(index.read(OFFSET.size))[0]
+            else:
+                end = None
+        with open(self.path, "rb") as log:
+            log.seek(begin)
+            data = log.read() if end is None else log.read(end - begin)
+        # Split on the bytes: str.splitlines() would also break on U+2028 and friends
+        return [json.loads(line) for line in data.split(b"\n")[:stop - start]]
+
+    def close(self):
+        self.log.close()
+        self.index.close()
+
+
+class TranscriptModel(QAbstractListModel):
+    # Window [first, first + len(rows)) of the log
+    def __init__(self, log, parent=None, max_rows=MAX_ROWS, page_size=PAGE_SIZE):
+        super().__init__(parent)
+        self.log = log
+        self.max_rows = max_rows
+        self.page_size = page_size
+        self.first = max(0, log.count - page_size)
+        self.rows = log.read(self.first, log.count)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return message["text"]
+        if role == Qt.ToolTipRole:
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(message["t"]))
+        return None
+
+    def at_tail(self):
+        return self.first + len(self.rows) == self.log.count
+
+    def append(self, text):
+        # Always logged; only shown if the window is at the newest messages
+        at_tail = self.at_tail()
+        message = self.log.append(text)
+        if not at_tail:
+            return False
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(message)
+        self.endInsertRows()
+        self._trim_front()
+        return True
+
+    def can_load_older(self):
+        return self.first > 0
+
+    def load_older(self):
+        # Returns how many rows were inserted at the top
+        start = max(0, self.first - self.page_size)
+        older = self.log.read(start, self.first)
+        if not older:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, len(older) - 1)
+        self.rows[:0] = older
+        self.first = start
+        self.endInsertRows()
+        self._trim_back()
+        return len(older)
+
+    def load_newer(self):
+        stop = self.first + len(self.rows)
+        newer = self.log.read(stop, stop + self.page_size)
+        if not newer:
+            return 0
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(newer) - 1)
+        self.rows.extend(newer)
+        self.endInsertRows()
+        return self._trim_front()
+
+    def _trim_front(self):
+        excess = len(self.rows) - self.max_rows
+        if excess <= 0:
+            return 0
+        self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+        del self.rows[:excess]
+        self.first += excess
+        self.endRemoveRows()
+        return excess
+
+    def _trim_back(self):
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), len(self.rows) - excess, len(self.rows) - 1)
+            del self.rows[-excess:]
+            self.endRemoveRows()
+
+
+class TranscriptDelegate(QStyledItemDelegate):
+    # Word-wrapped size hints are what makes relayout slow; each message is measured
+    # once per view width, so an append only measures the new row
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hints = {}               # (message number, width) -> QSize
+
+    def sizeHint(self, option, index):
+        model = index.model()
+        key = (model.first + index.row(), option.rect.width())
+        hint = self.hints.get(key)
+        if hint is None:
+            if len(self.hints) > 4 * model.max_rows:
+                self.hints = {k: v for k, v in self.hints.items() if k[0] >= model.first}
+            hint = self.hints[key] = super().sizeHint(option, index)
+        return hint
+
+
+class TranscriptView(QListView):
+    # Drop-in for the old read-only QTextEdit: append(text) adds a message
+    def __init__(self, parent=None, log_path=LOG_PATH):
+        super().__init__(parent)
+        self.transcript = TranscriptModel(TranscriptLog(log_path), self)
+        self.setModel(self.transcript)
+        self.setItemDelegate(TranscriptDelegate(self))
+        self.setWordWrap(True)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.paging = False
+        self.verticalScrollBar().valueChanged.connect(self.on_scroll)
+        QTimer.singleShot(0, self.scrollToBottom)
+
+    def append(self, text):
+        bar = self.verticalScrollBar()
+        follow = bar.value() >= bar.maximum() - 4
+        if self.transcript.append(text) and follow:
+            self.doItemsLayout()
+            self.scrollToBottom()
+
+    def on_scroll(self, value):
+        if self.paging:
+            return
+        bar = self.verticalScrollBar()
+        if value == bar.minimum() and self.transcript.can_load_older():
+            QTimer.singleShot(0, self.page_older)
+        elif value == bar.maximum() and not self.transcript.at_tail():
+            QTimer.singleShot(0, self.page_newer)
+
+    def page_older(self):
+        self.paging = True
+        loaded = self.transcript.load_older()
+        if loaded:
+            # Keep the message that was on top where it was
+            self.doItemsLayout()
+            self.scrollTo(self.transcript.index(loaded), QAbstractItemView.PositionAtTop)
+        self.paging = False
+
+    def page_newer(self):
+        self.paging = True
+        anchor = self.indexAt(self.viewport().rect().bottomLeft())
+        row = anchor.row() if anchor.isValid() else self.transcript.rowCount() - 1
+        trimmed = self.transcript.load_newer()
+        self.doItemsLayout()
+        self.scrollTo(self.transcript.index(max(0, row - trimmed)), QAbstractItemView.PositionAtBottom)
+        self.paging = False
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            QGuiApplication.clipboard().setText("\n".join(self.transcript.rows[row]["text"] for row in rows))
+            return
+        super().keyPressEvent(event)
@@ -0,0 +1,158 @@
+# Per-turn latency tracing: every chat turn (or idle quote / transform) becomes one JSONL
+# record of named spans with durations and extra fields (token counts, tokens/sec...).
+# Spans opened outside a turn cost nothing and are dropped. The log rolls over at
+# MAX_LOG_BYTES, and session percentiles feed the optional on-screen TraceHud.
+
+import os
+import json
+import math
+import time
+import functools
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QLabel
+
+LOG_PATH = "turn_traces.jsonl"
+MAX_LOG_BYTES = 5 * 2**20
+LOG_BACKUPS = 3
+SESSION_SAMPLES = 1000       # per span name, for p50/p95
+
+def append_rolling(path, record, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS):
+    # Append one JSON line; path -> path.1 -> path.2 ... once it grows past max_bytes
+    if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+        for i in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+def percentile(values, q):
+    # Nearest-rank percentile of a non-empty sequence
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class TurnTracer:
+    def __init__(self, log_path=LOG_PATH, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS):
+        self.log_path = log_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.turn_record = None
+        self.stack = []               # open span names, for "parent/child" span paths
+        self.session = defaultdict(lambda: deque(maxlen=SESSION_SAMPLES))
+        self.last_turn = None
+        self.listeners = []           # called with each finished turn record
+
+    def now_ms(self):
+        return time.perf_counter() * 1000
+
+    @contextmanager
+    def turn(self, kind, **fields):
+        if self.turn_record is not None:
+            # Already inside a turn (e.g. a transform triggered by a prompt): just a span
+            with self.span(kind, **fields) as span:
+                yield span
+            return
+
+        start = self.now_ms()
+        self.turn_record = {"kind": kind, "time": time.time(), "spans": [], **fields}
+        try:
+            yield self.turn_record
+        finally:
+            record, self.turn_record = self.turn_record, None
+            self.stack.clear()
+            record["total_ms"] = round(self.now_ms() - start, 2)
+            for span in record["spans"]:
+                span["start_ms"] = round(span["start_ms"] - start, 2)
+            self.finish(record)
+
+    @contextmanager
+    def span(self, name, **fields):
+        if self.turn_record is None:
+            yield {}
+            return
+
+        self.stack.append(name)
+        span = {"name": "/".join(self.stack), **fields}
+        start = self.now_ms()
+        try:
+            yield span
+        finally:
+            span["start_ms"] = start
+            span["duration_ms"] = round(self.now_ms() - start, 2)
+            self.stack.pop()
+            self.turn_record["spans"].append(span)
+
+    def traced(self, name, turn=False):
+        # Decorator form of span() / turn() for whole methods
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with (self.turn(name) if turn else self.span(name)):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def finish(self, record):
+        record["spans"].sort(key=lambda span: span["start_ms"])
+        self.session[f"{record['kind']} total"].append(record["total_ms"])
+        for span in record["spans"]:
+            self.session[span["name"]].append(span["duration_ms"])
+        self.last_turn = record
+        self.write(record)
+        for listener in self.listeners:
+            listener(record)
+
+    def write(self, record):
+        try:
+            append_rolling(self.log_path, record, self.max_bytes, self.backups)
+        except OSError as e:
+            print(f"[WARN] TurnTracer: could not write {self.log_path}: {e}")
+
+    def stats(self):
+        # {span name: (count, p50, p95)} over this session
+        return {
+            name: (len(values), percentile(values, 50), percentile(values, 95))
+            for name, values in self.session.items() if values
+        }
+
+
+class TraceHud(QLabel):
+    # Small overlay on the view: last turn breakdown + session p50/p95 per span
+    def __init__(self, tracer, parent):
+        super().__init__(parent)
+        self.tracer = tracer
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: #7CFC00; padding: 6px;")
+        self.setFont(QFont("monospace", 8))
+        self.setText("trace: waiting for a turn")
+        self.adjustSize()
+        self.move(8, 8)
+        tracer.listeners.append(self.on_turn)
+
+    def on_turn(self, record):
+        if self.isVisible():
+            self.refresh()
+
+    def refresh(self):
+        record = self.tracer.last_turn
+        if record is None:
+            return
+        stats = self.tracer.stats()
+        count, p50, p95 = stats[f"{record['kind']} total"]
+        lines = [f"{record['kind']}: {record['total_ms']:.0f} ms  (p50 {p50:.0f} / p95 {p95:.0f} over {count})"]
+        for span in record["spans"]:
+            count, p50, p95 = stats.get(span["name"], (0, 0, 0))
+            extra = f"  {span['tokens_per_s']:.1f} tok/s" if "tokens_per_s" in span else ""
+            lines.append(f"  {span['name']:<28}{span['duration_ms']:8.1f}  p50 {p50:7.1f}  p95 {p95:7.1f}{extra}")
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.raise_()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+        if self.isVisible():
+            self.refresh()
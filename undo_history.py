@@ -0,0 +1,79 @@
+# Delta-based undo/redo for the VFX editor
+#
+# Each entry stores only what an edit changed: a layer id plus {field: value} before and
+# after. Consecutive edits of the same fields on the same layer within MERGE_WINDOW_S are
+# folded into one entry (a spinbox scroll or a handle drag undoes in one step), and the
+# history is capped so long sessions keep flat memory.
+
+import time
+from collections import deque
+
+HISTORY_LIMIT = 200
+MERGE_WINDOW_S = 1.0
+
+
+class LayerEdit:
+    __slots__ = ("layer", "before", "after", "stamp")
+
+    def __init__(self, layer, before, after, stamp):
+        self.layer = layer
+        self.before = before
+        self.after = after
+        self.stamp = stamp
+
+
+class UndoHistory:
+    def __init__(self, limit=HISTORY_LIMIT, merge_window=MERGE_WINDOW_S):
+        self.undo_stack = deque(maxlen=limit)   # oldest entries fall off the end
+        self.redo_stack = deque(maxlen=limit)
+        self.merge_window = merge_window
+        self.mergeable = False
+
+    def record(self, layer, before, after, merge=True):
+        # Keep only the fields that actually changed; a no-op edit records nothing
+        changed = [key for key in before if before[key] != after.get(key)]
+        if not changed:
+            return False
+        before = {key: before[key] for key in changed}
+        after = {key: after[key] for key in changed}
+        now = time.monotonic()
+
+        top = self.undo_stack[-1] if self.undo_stack else None
+        if (merge and self.mergeable and top is not None and top.layer == layer
+                and top.after.keys() == after.keys() and now - top.stamp < self.merge_window):
+            top.after = after
+            top.stamp = now
+            if top.before == top.after:
+                self.undo_stack.pop()     # edited back to where it started
+        else:
+            self.undo_stack.append(LayerEdit(layer, before, after, now))
+
+        self.redo_stack.clear()
+        self.mergeable = True
+        return True
+
+    def break_merge(self):
+        # The next edit starts a new entry even if it touches the same fields
+        self.mergeable = False
+
+    def undo(self):
+        # Returns (layer, fields to restore) or None
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        self.redo_stack.append(edit)
+        self.mergeable = False
+        return edit.layer, edit.before
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        self.undo_stack.append(edit)
+        self.mergeable = False
+        return edit.layer, edit.after
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.mergeable = False
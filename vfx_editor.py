@@ -1,17 +1,35 @@
 import os, json, shutil
+from collections import OrderedDict
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QLabel, QFileDialog, QSlider,
     QPushButton, QVBoxLayout, QHBoxLayout, QWidget, QGraphicsView, QGraphicsScene,
     QGraphicsProxyWidget, QGraphicsRectItem, QComboBox, QGraphicsItem
 )
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QMovie, QColor, QPen, QKeyEvent, QWheelEvent
+from PySide6.QtGui import QMovie, QColor, QPen, QKeyEvent, QWheelEvent, QImageReader
+from batch_runner import atomic_output
 
 ASSETS_DIR = "assets/vfx"
 EXPRESSIONS_DIR = "assets/default"
 CONFIG_PATH = "effects_config.json"
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
+SCENE_CACHE_MB = 512         # decoded GIF frames kept for recently viewed states
+
+class StateScene:
+    # A built scene per state: switching back to a state is a setScene(), not a rebuild
+    def __init__(self):
+        self.scene = QGraphicsScene()
+        self.proxies = []            # (proxy, gif name)
+        self.movie_paths = set()     # shared movies shown in this scene
+        self.source = {}             # config section the scene shows
+        self.baseline = {}           # layout read back from the proxies as built
+
+def decoded_bytes(path):
+    # What CacheAll will hold for this GIF once every frame has been played
+    reader = QImageReader(path)
+    size = reader.size()
+    return max(1, size.width()) * max(1, size.height()) * 4 * max(1, reader.imageCount())
 
 class VFXEditor(QMainWindow):
     def __init__(self):
@@ -19,8 +37,7 @@ class VFXEditor(QMainWindow):
         self.setWindowTitle("Genos VFX Editor")
         self.resize(SCREEN_WIDTH, SCREEN_HEIGHT + 150)
 
-        self.scene = QGraphicsScene()
-        self.view = QGraphicsView(self.scene)
+        self.view = QGraphicsView()
         self.setCentralWidget(QWidget())
         layout = QVBoxLayout(self.centralWidget())
 
@@ -68,14 +85,20 @@ class VFXEditor(QMainWindow):
         self.active_proxy = None
         self.highlight_rect = None
 
+        # Built scenes by state, least recently viewed first, and the decoded GIFs they
+        # share: a GIF used by several states is decoded and cached once
+        self.state_scenes = OrderedDict()
+        self.movies = {}             # path -> QMovie
+        self.movie_bytes = {}        # path -> estimated decoded size
+
         self.load_state("neutral")
 
     def load_config(self):
         return json.load(open(CONFIG_PATH)) if os.path.exists(CONFIG_PATH) else {"states": {}}
 
-    def save_config(self):
+    def scene_layout(self, built):
         out = {}
-        for proxy, name in self.vfx_proxies:
+        for proxy, name in built.proxies:
             w = proxy.widget()
             out[name] = {
                 "position_percent": [proxy.pos().x()/SCREEN_WIDTH, proxy.pos().y()/SCREEN_HEIGHT],
@@ -83,46 +106,124 @@ class VFXEditor(QMainWindow):
                 "rotation": proxy.rotation(),
                 "opacity": proxy.opacity()
             }
-        self.config["states"][self.current_state] = out
-        with open(CONFIG_PATH, "w") as f:
-            json.dump(self.config, f, indent=4)
-        print("✔ Saved config")
+        return out
 
-    def load_state(self, state):
-        self.scene.clear()
+    def save_config(self):
+        built = self.state_scenes[self.current_state]
+        out = self.scene_layout(built)
 
-        # ✅ Recreate background_label after scene.clear()
-        self.background_label = QLabel()
-        self.background_label.setScaledContents(True)
-        self.background_label.setGeometry(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
-        self.scene.addWidget(self.background_label)
+        # Merge into the latest file so edits the running bot saved meanwhile survive:
+        # only overlays added, moved or deleted in this scene since it was built are written
+        self.config = self.load_config()
+        merged = dict(self.config.get("states", {}).get(self.current_state, {}))
+        for name in built.baseline.keys() | out.keys():
+            if out.get(name) == built.baseline.get(name):
+                continue
+            if name in out:
+                merged[name] = out[name]
+            else:
+                merged.pop(name, None)
+        self.config.setdefault("states", {})[self.current_state] = merged
+        # Atomic replace: a running bot hot-reloads this file and must never see half of it
+        with atomic_output(CONFIG_PATH) as temp_path:
+            with open(temp_path, "w") as f:
+                json.dump(self.config, f, indent=4)
+        print("✔ Saved config")
+
+        built.source, built.baseline = out, out
+        if merged != out:
+            # The file has edits this scene does not show yet: rebuild it from the file
+            self.load_state(self.current_state)
 
-        self.vfx_proxies.clear()
+    def load_state(self, state):
+        if self.highlight_rect:
+            self.scene.removeItem(self.highlight_rect)
+            self.highlight_rect = None
         self.active_proxy = None
+
+        # Unsaved edits stay with a cached state until it is evicted; a cached state with
+        # none is rebuilt when its section of the file changed since it was built
+        self.config = self.load_config()
+        section = self.config.get("states", {}).get(state, {})
+        built = self.state_scenes.pop(state, None)
+        stale = None
+        if built is not None and built.source != section and self.scene_layout(built) == built.baseline:
+            stale, built = built, None
+        built = built or self.build_state(state)
+        self.state_scenes[state] = built
+        if stale is not None:
+            self.release_movies(stale)
         self.current_state = state
+        self.scene = built.scene
+        self.vfx_proxies = built.proxies
+        self.view.setScene(self.scene)
+
+        self.play_movies(built)
+        self.evict_states()
+
+    def build_state(self, state):
+        built = StateScene()
+        background_label = QLabel()
+        background_label.setScaledContents(True)
+        background_label.setGeometry(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        built.scene.addWidget(background_label)
 
         # Load background expression GIF
         bg_path = os.path.join(EXPRESSIONS_DIR, f"{state}.gif")
         if os.path.exists(bg_path):
-            bg_movie = QMovie(bg_path)
-            bg_movie.setCacheMode(QMovie.CacheAll)
-            bg_movie.start()
-            self.background_label.setMovie(bg_movie)
+            background_label.setMovie(self.shared_movie(bg_path, built))
 
         # Load overlays
-        state_data = self.config.get("states", {}).get(state, {})
-        for name, cfg in state_data.items():
-            self.spawn_vfx(name, cfg)
-
-    def spawn_vfx(self, gif, cfg):
+        built.source = self.config.get("states", {}).get(state, {})
+        for name, cfg in built.source.items():
+            self.spawn_vfx(name, cfg, built)
+        built.baseline = self.scene_layout(built)
+        return built
+
+    def shared_movie(self, path, built):
+        movie = self.movies.get(path)
+        if movie is None:
+            movie = self.movies[path] = QMovie(path)
+            movie.setCacheMode(QMovie.CacheAll)
+            self.movie_bytes[path] = decoded_bytes(path)
+        built.movie_paths.add(path)
+        return movie
+
+    def play_movies(self, built):
+        # Only the visible state's movies advance; the rest keep their cached frames
+        for path, movie in self.movies.items():
+            if path in built.movie_paths:
+                if movie.state() == QMovie.NotRunning:
+                    movie.start()
+                else:
+                    movie.setPaused(False)
+            elif movie.state() == QMovie.Running:
+                movie.setPaused(True)
+
+    def evict_states(self):
+        # Drop least recently viewed states until the shared frames fit the cap
+        while len(self.state_scenes) > 1 and sum(self.movie_bytes.values()) > SCENE_CACHE_MB * 2**20:
+            # Dropping the last reference destroys the scene along with its items
+            _, built = self.state_scenes.popitem(last=False)
+            self.release_movies(built)
+
+    def release_movies(self, built):
+        # Stop and forget the movies of a dropped scene that no cached state still shows
+        in_use = set().union(*(s.movie_paths for s in self.state_scenes.values()))
+        for path in built.movie_paths - in_use:
+            self.movies.pop(path).stop()
+            del self.movie_bytes[path]
+
+    def spawn_vfx(self, gif, cfg, built=None):
+        built = built or self.state_scenes[self.current_state]
         path = os.path.join(ASSETS_DIR, gif)
         if not os.path.exists(path): return
         label = QLabel()
         label.setStyleSheet("background: transparent")
         label.setScaledContents(True)
-        movie = QMovie(path)
-        movie.setCacheMode(QMovie.CacheAll)
-        movie.start()
+        movie = self.shared_movie(path, built)
+        if built is self.state_scenes.get(self.current_state):
+            self.play_movies(built)
         label.setMovie(movie)
         w, h = cfg.get("size_percent", [0.2, 0.2])
         label.resize(w*SCREEN_WIDTH, h*SCREEN_HEIGHT)
@@ -142,8 +243,8 @@ class VFXEditor(QMainWindow):
         proxy.wheelEvent = self.scroll_resize
         proxy.mouseMoveEvent = lambda e, p=proxy: self.drag_with_snap(e, p)
 
-        self.scene.addItem(proxy)
-        self.vfx_proxies.append((proxy, gif))
+        built.scene.addItem(proxy)
+        built.proxies.append((proxy, gif))
 
     def add_vfx(self):
         paths, _ = QFileDialog.getOpenFileNames(self, "Select GIFs", ASSETS_DIR, "GIF Files (*.gif)")
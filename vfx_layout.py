@@ -0,0 +1,84 @@
+# Compiled VFX layouts: effects_config stores layer geometry as fractions of the window
+# (the source of truth); this turns a state's layers into pixel geometry once per window
+# size and keeps the result, so state switches and resizes skip the per-layer math.
+
+from collections import OrderedDict, namedtuple
+
+MAX_LAYOUTS = 64             # (state, size) entries kept; resizing walks through many sizes
+
+DEFAULT_POSITION = [0.1, 0.1]
+DEFAULT_SIZE = [0.3, 0.3]
+DEFAULT_OPACITY = 0.8
+
+LayerGeometry = namedtuple("LayerGeometry", "x y w h rotation opacity")
+
+
+def compile_layer(cfg, size):
+    screen_w, screen_h = size
+    pos_percent = cfg.get("position_percent", DEFAULT_POSITION)
+    size_percent = cfg.get("size_percent", DEFAULT_SIZE)
+    return LayerGeometry(
+        pos_percent[0] * screen_w,
+        pos_percent[1] * screen_h,
+        int(size_percent[0] * screen_w),
+        int(size_percent[1] * screen_h),
+        cfg.get("rotation", 0),
+        cfg.get("opacity", DEFAULT_OPACITY)
+    )
+
+def to_percent(x, y, w, h, size):
+    # Inverse of compile_layer for the geometry part
+    screen_w, screen_h = max(1, size[0]), max(1, size[1])
+    return [x / screen_w, y / screen_h], [w / screen_w, h / screen_h]
+
+
+def diff_states(old_config, new_config):
+    # {state: {"added": set, "removed": set, "changed": set}} for states whose layers differ
+    old_states = old_config.get("states", {})
+    new_states = new_config.get("states", {})
+    changes = {}
+    for state_name in old_states.keys() | new_states.keys():
+        old_layers = old_states.get(state_name, {})
+        new_layers = new_states.get(state_name, {})
+        if old_layers == new_layers:
+            continue
+        changes[state_name] = {
+            "added": new_layers.keys() - old_layers.keys(),
+            "removed": old_layers.keys() - new_layers.keys(),
+            "changed": {name for name in old_layers.keys() & new_layers.keys()
+                        if old_layers[name] != new_layers[name]}
+        }
+    return changes
+
+
+class VfxLayout:
+    def __init__(self, config, max_layouts=MAX_LAYOUTS):
+        self.config = config
+        self.max_layouts = max_layouts
+        self.layouts = OrderedDict()   # (state, w, h) -> {gif_name: LayerGeometry}
+
+    def compile(self, state_name, size):
+        key = (state_name, int(size[0]), int(size[1]))
+        layout = self.layouts.get(key)
+        if layout is not None:
+            self.layouts.move_to_end(key)
+            return layout
+
+        state_data = self.config.get("states", {}).get(state_name, {})
+        layout = {gif_name: compile_layer(cfg, key[1:]) for gif_name, cfg in state_data.items()}
+        self.layouts[key] = layout
+        if len(self.layouts) > self.max_layouts:
+            self.layouts.popitem(last=False)
+        return layout
+
+    def invalidate(self, state_name=None):
+        # Drop compiled layouts after their percent source changed (None: everything)
+        if state_name is None:
+            self.layouts.clear()
+            return
+        for key in [key for key in self.layouts if key[0] == state_name]:
+            del self.layouts[key]
+
+    def set_config(self, config):
+        self.config = config
+        self.invalidate()
@@ -0,0 +1,105 @@
+# Cached, offline-capable page fetcher for the wiki scraping step
+#
+# Pages are stored in CACHE_DIR as <key>.html + <key>.json (ETag / Last-Modified).
+# A copy of that folder doubles as an offline snapshot: with offline=True nothing
+# touches the network and a missing page is an error.
+
+import os
+import json
+import time
+import hashlib
+import asyncio
+import requests
+from batch_runner import atomic_output
+
+CACHE_DIR = ".wiki_cache"
+MAX_AGE = 24 * 3600          # serve cached pages without revalidating for a day
+CONCURRENCY = 4
+TIMEOUT = 10
+
+class FetchError(Exception):
+    pass
+
+def cache_paths(cache_dir, url):
+    key = hashlib.sha256(url.encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, key + ".html"), os.path.join(cache_dir, key + ".json")
+
+def read_cached(cache_dir, url):
+    body_path, meta_path = cache_paths(cache_dir, url)
+    try:
+        with open(body_path, "r", encoding="utf-8") as f:
+            body = f.read()
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None, {}
+    return body, meta
+
+def write_cached(cache_dir, url, body, meta):
+    os.makedirs(cache_dir, exist_ok=True)
+    body_path, meta_path = cache_paths(cache_dir, url)
+    if body is not None:
+        with atomic_output(body_path) as temp_path:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(body)
+    with atomic_output(meta_path) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(meta, f, indent=4)
+
+def fetch_page(url, cache_dir=CACHE_DIR, offline=False, max_age=MAX_AGE):
+    body, meta = read_cached(cache_dir, url)
+    if offline:
+        if body is None:
+            raise FetchError(f"{url} is not in the offline snapshot {cache_dir}")
+        return body
+    if body is not None and time.time() - meta.get("fetched_at", 0) < max_age:
+        return body
+
+    # Revalidate: the server can answer 304 and we keep the cached body
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        response = requests.get(url, headers=headers, timeout=TIMEOUT)
+        if response.status_code == 304 and body is not None:
+            meta["fetched_at"] = time.time()
+            write_cached(cache_dir, url, None, meta)
+            return body
+        response.raise_for_status()
+    except requests.RequestException as e:
+        if body is not None:
+            print(f"[WARN] {url}: {e}; using cached copy")
+            return body
+        raise FetchError(f"{url}: {e}") from e
+
+    meta = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "fetched_at": time.time()
+    }
+    write_cached(cache_dir, url, response.text, meta)
+    return response.text
+
+async def fetch_all(urls, concurrency=CONCURRENCY, **kwargs):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(url):
+        async with semaphore:
+            try:
+                return url, await asyncio.to_thread(fetch_page, url, **kwargs)
+            except FetchError as e:
+                # Offline mode is strict: a missing snapshot page must not silently change the data
+                if kwargs.get("offline"):
+                    raise
+                print(f"[WARN] {e}")
+                return url, None
+
+    return dict(await asyncio.gather(*(fetch_one(url) for url in urls)))
+
+def fetch_pages(urls, concurrency=CONCURRENCY, **kwargs):
+    # Returns {url: html or None}; at most `concurrency` requests are in flight
+    return asyncio.run(fetch_all(urls, concurrency, **kwargs))